@@ -1,14 +1,38 @@
 import customtkinter as ctk
+from tkinter import filedialog
 from CTkListbox import CTkListbox
+import heapq
 import json
 import os
+from collections import namedtuple
 from color_config import ColorConfig
 from stat_calculator import StatCalculator
 from result_window import ResultWindow
+from background_job import BackgroundJob
+from bulk_import import import_file, rejects_path_for
+from gear_optimizer import optimize_gear, PHYSICAL_DAMAGE, MAGICAL_DAMAGE
+from what_if import compare_all, sort_key
+from item_catalogue import open_catalogue, source_fingerprint, write_catalogue
+from records import ItemRecords
+from label_index import LabelIndex
+from search_index import ItemSearchIndex
+from snapshot_cache import load_snapshot, save_snapshot, snapshot_key
+from storage import default_database_path, empty_database, open_storage
+from virtual_list import VirtualList
+from widget_lifecycle import WidgetLifecycle
 from constants import stats, character_classes
+from stat_registry import STAT_REGISTRY
 
 import sys
 
+DATABASE_LOAD_CHUNK = 5000  # items indexed between progress updates while loading
+AUTOSAVE_INTERVAL_MS = 60000
+SEARCH_RESULT_ROW_HEIGHT = 110  # estimated height of a one-stat result row until rows are measured
+SEARCH_DEBOUNCE_MS = 150  # quiet time after a selection or filter change before searching
+
+# The widgets of one selected stat in the Item Stats and Character Stats panels
+StatRow = namedtuple("StatRow", ["item_label", "item_entry", "item_remove", "char_label", "char_entry", "char_remove"])
+
 def resource_path(relative_path):
     try:
         base_path = sys._MEIPASS
@@ -29,20 +53,47 @@ class App(ctk.CTk):
 
         # Initialize Data
         self.current_language = "zh-cn"
-        self.calculator = StatCalculator(self)
         self.item_stats_data = {}
         self.character_stats_data = {}
         self.history = []
         self.redo_stack = []
         self.max_history = 50
         self.character_classes = character_classes
-        self.database_file = "config.json"
+        # Filter boxes look names up here and only grid or hide the rows whose match changed
+        self.stat_index = LabelIndex(stats)
+        self.class_index = LabelIndex((class_name,) for class_name in self.character_classes)
+        self.filter_shown = {}  # filter name -> ids of the rows currently gridded
+        # Stat rows and search rows are created through here and reused, never just forgotten
+        self.widgets = WidgetLifecycle()
+        self.entry_stats = {}  # stat entry -> the stat it is currently bound to
+        # Results of the current item + character build; stat entry edits only recompute
+        # the edited stat and the stats derived from it.
+        self.build_calculator = None
+        self.database_file = default_database_path()
         self.session_file = "session.json"
-        if os.path.exists(self.database_file):
-            with open(self.database_file, "r", encoding='utf-8') as f:
-                self.database = json.load(f)
-        else:
-            self.database = {"items": {}, "characters": {}}
+        # Memory-mapped snapshot of the items, rewritten on exit when it no longer matches
+        self.catalogue_file = "config.cat"
+        # Pickled database + search index, used while the source files are unchanged
+        self.snapshot_file = self.database_file + ".snapshot"
+        self.storage = open_storage(self.database_file)
+        # Filled in by the background load started once the UI is up
+        self.database = empty_database()
+        self.database_loaded = False
+        self.database_load_job = None
+        # Item classes (shards) in self.database, None once every class is loaded.
+        # Storages without class_shards always load everything.
+        self.loaded_classes = set()
+        self.loading_classes = None
+        self.pending_classes = set()
+        self.after_load_callbacks = []
+        self.calculator = StatCalculator(database=self.database)
+        self.catalogue = None
+        self.catalogue_job = None
+        # Records changed in self.database that the storage does not have yet
+        self.dirty_items = set()
+        self.dirty_characters = set()
+        self.save_job = None
+        self.autosave_after_id = None
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
@@ -59,6 +110,7 @@ class App(ctk.CTk):
         self.bind("<Control-z>", lambda event: self.undo())
         self.bind("<Control-y>", lambda event: self.redo())
         self.bind("<Control-s>", lambda event: self.save_database())
+        self.bind("<F12>", lambda event: self.show_widget_readout())
         self.bind("<Return>", lambda event: self.show_result())
 
         # Top Frame (Language Switch and Tab Buttons)
@@ -132,6 +184,32 @@ class App(ctk.CTk):
         )
         self.search_tab_btn.pack(side="left", padx=5)
 
+        self.optimizer_tab_btn = ctk.CTkButton(
+            self.tab_button_frame,
+            text="Optimizer",
+            font=self.tab_font,
+            width=100,
+            corner_radius=15,
+            fg_color=ColorConfig.DIM,
+            hover_color=ColorConfig.HOVER,
+            text_color=ColorConfig.TEXT_BUTTON,
+            command=lambda: self.switch_tab("Optimizer")
+        )
+        self.optimizer_tab_btn.pack(side="left", padx=5)
+
+        self.compare_tab_btn = ctk.CTkButton(
+            self.tab_button_frame,
+            text="Compare",
+            font=self.tab_font,
+            width=100,
+            corner_radius=15,
+            fg_color=ColorConfig.DIM,
+            hover_color=ColorConfig.HOVER,
+            text_color=ColorConfig.TEXT_BUTTON,
+            command=lambda: self.switch_tab("Compare")
+        )
+        self.compare_tab_btn.pack(side="left", padx=5)
+
         # Center Frame (Tab Content)
         self.center_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.center_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
@@ -146,6 +224,15 @@ class App(ctk.CTk):
         self.default_tab_frame = ctk.CTkFrame(self.tab_container, fg_color="transparent")
         self.damage_tab_frame = ctk.CTkFrame(self.tab_container, fg_color="transparent")
         self.search_tab_frame = ctk.CTkFrame(self.tab_container, fg_color="transparent")
+        self.optimizer_tab_frame = ctk.CTkFrame(self.tab_container, fg_color="transparent")
+        self.compare_tab_frame = ctk.CTkFrame(self.tab_container, fg_color="transparent")
+        self.tab_frames = {
+            "Default": (self.default_tab_frame, self.default_tab_btn),
+            "Damage": (self.damage_tab_frame, self.damage_tab_btn),
+            "Search": (self.search_tab_frame, self.search_tab_btn),
+            "Optimizer": (self.optimizer_tab_frame, self.optimizer_tab_btn),
+            "Compare": (self.compare_tab_frame, self.compare_tab_btn),
+        }
         
         self.current_tab = "Default"
         self.default_tab_frame.grid(row=0, column=0, sticky="nsew")
@@ -154,37 +241,26 @@ class App(ctk.CTk):
         self.create_default_tab()
         self.create_damage_tab()
         self.create_search_tab()
+        self.create_optimizer_tab()
+        self.create_compare_tab()
 
         self.label_column_minsize = 200
 
         # Load session after UI is created
         self.load_session()
+        self.start_database_load(classes=self.shard_classes(self.char_class_entry.get()))
 
     def switch_tab(self, tab_name):
-        if not self.winfo_exists() or self.current_tab == tab_name:
+        if not self.winfo_exists() or self.current_tab == tab_name or tab_name not in self.tab_frames:
             return
         self.current_tab = tab_name
-        if tab_name == "Default":
-            self.damage_tab_frame.grid_remove()
-            self.search_tab_frame.grid_remove()
-            self.default_tab_frame.grid(row=0, column=0, sticky="nsew")
-            self.default_tab_btn.configure(fg_color=ColorConfig.ACCENT)
-            self.damage_tab_btn.configure(fg_color=ColorConfig.DIM)
-            self.search_tab_btn.configure(fg_color=ColorConfig.DIM)
-        elif tab_name == "Damage":
-            self.default_tab_frame.grid_remove()
-            self.search_tab_frame.grid_remove()
-            self.damage_tab_frame.grid(row=0, column=0, sticky="nsew")
-            self.default_tab_btn.configure(fg_color=ColorConfig.DIM)
-            self.damage_tab_btn.configure(fg_color=ColorConfig.ACCENT)
-            self.search_tab_btn.configure(fg_color=ColorConfig.DIM)
-        else:  # Search
-            self.default_tab_frame.grid_remove()
-            self.damage_tab_frame.grid_remove()
-            self.search_tab_frame.grid(row=0, column=0, sticky="nsew")
-            self.default_tab_btn.configure(fg_color=ColorConfig.DIM)
-            self.damage_tab_btn.configure(fg_color=ColorConfig.DIM)
-            self.search_tab_btn.configure(fg_color=ColorConfig.ACCENT)
+        for name, (frame, button) in self.tab_frames.items():
+            if name == tab_name:
+                frame.grid(row=0, column=0, sticky="nsew")
+                button.configure(fg_color=ColorConfig.ACCENT)
+            else:
+                frame.grid_remove()
+                button.configure(fg_color=ColorConfig.DIM)
         self.status_label.configure(text=f"Switched to {tab_name} tab")
 
     def create_default_tab(self):
@@ -250,7 +326,7 @@ class App(ctk.CTk):
                                                         corner_radius=12, width=240, height=140)
         self.char_class_dropdown.grid(row=1, column=0, padx=5, pady=(0, 10), sticky="ew")
         self.char_class_dropdown.grid_remove()
-        self.populate_class_dropdown(self.character_classes)
+        self.char_class_buttons = self.create_class_buttons(self.char_class_dropdown, self.select_class)
 
         # Frame chứa nút Add và Reset
         button_frame = ctk.CTkFrame(self.side_1_frame, fg_color="transparent")
@@ -317,7 +393,7 @@ class App(ctk.CTk):
         self.side_4_frame = ctk.CTkFrame(tab_frame, fg_color="transparent")
         self.side_4_frame.grid(row=1, column=0, columnspan=3, padx=15, pady=(10, 15), sticky="ew")
         self.side_4_frame.grid_columnconfigure(0, weight=1)
-        self.side_4_frame.grid_columnconfigure((1, 2), weight=0)
+        self.side_4_frame.grid_columnconfigure((1, 2, 3, 4), weight=0)
 
         self.status_label = ctk.CTkLabel(self.side_4_frame, text="Ready", font=self.entry_font, text_color=ColorConfig.TEXT,
                                         fg_color=ColorConfig.SECONDARY_FG, padx=8, pady=4, corner_radius=8)
@@ -331,12 +407,18 @@ class App(ctk.CTk):
                                         font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
         self.result_btn.grid(row=0, column=2, padx=10, pady=10)
 
-        self.item_stats_entries = []
-        self.item_stat_labels = []
-        self.item_remove_buttons = []
-        self.character_stats_entries = []
-        self.character_stat_labels = []
-        self.character_remove_buttons = []
+        self.import_btn = ctk.CTkButton(self.side_4_frame, text="Import", width=120, command=self.import_database,
+                                        font=self.button_font, corner_radius=12, fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        self.import_btn.grid(row=0, column=3, padx=10, pady=10)
+        self.import_job = None
+
+        self.autosave_checkbox = ctk.CTkCheckBox(self.side_4_frame, text="Autosave", command=self.toggle_autosave,
+                                                 font=self.button_font, text_color=ColorConfig.TEXT,
+                                                 fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER)
+        self.autosave_checkbox.grid(row=0, column=4, padx=10, pady=10)
+
+        # Stat rows by stat id; their order on screen is self.selected_stats
+        self.stat_rows = {}
 
     def create_damage_tab(self):
         tab_frame = self.damage_tab_frame
@@ -458,19 +540,40 @@ class App(ctk.CTk):
         self.search_filter_entry.bind("<FocusOut>", lambda e: self.search_filter_entry.configure(border_color=ColorConfig.BORDER_DEFAULT))
         self.search_filter_entry.bind("<KeyRelease>", self.filter_search_stats)
 
-        self.search_listbox = CTkListbox(self.search_left_frame, multiple_selection=True, height=400, width=240,
+        self.search_listbox = CTkListbox(self.search_left_frame, multiple_selection=True, height=320, width=240,
+                                        command=lambda selection: self.schedule_search(),
                                         font=self.entry_font, border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT,
                                         hover_color=ColorConfig.LISTBOX_HOVER, highlight_color=ColorConfig.LISTBOX_HIGHLIGHT)
         self.search_listbox.grid(row=3, column=0, padx=15, pady=10, sticky="nsew")
         for i, (listbox_stat, _, _) in enumerate(stats):
             self.search_listbox.insert(i, listbox_stat)
 
+        # Range filter: min/max applied to the stats selected in the listbox
+        self.search_ranges = {}
+        self.search_range_frame = ctk.CTkFrame(self.search_left_frame, fg_color="transparent")
+        self.search_range_frame.grid(row=4, column=0, padx=15, pady=(0, 5), sticky="ew")
+        self.search_range_frame.grid_columnconfigure((0, 1), weight=1)
+
+        self.search_min_entry = ctk.CTkEntry(self.search_range_frame, placeholder_text="Min", width=70, height=30,
+                                            border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+        self.search_min_entry.grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        self.search_max_entry = ctk.CTkEntry(self.search_range_frame, placeholder_text="Max", width=70, height=30,
+                                            border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+        self.search_max_entry.grid(row=0, column=1, padx=5, sticky="ew")
+        self.search_range_btn = ctk.CTkButton(self.search_range_frame, text="Set Range", width=80, height=30, command=self.set_search_range,
+                                            font=self.button_font, corner_radius=12, fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        self.search_range_btn.grid(row=0, column=2, padx=(5, 0))
+
+        self.search_range_label = ctk.CTkLabel(self.search_left_frame, text="No range filters", font=self.entry_font,
+                                            text_color=ColorConfig.TEXT, wraplength=240, justify="left")
+        self.search_range_label.grid(row=5, column=0, padx=15, pady=(0, 5), sticky="w")
+
         # Character Class Combobox for Search
         search_class_label = ctk.CTkLabel(self.search_left_frame, text="Character Class", font=self.label_font, text_color=ColorConfig.TEXT)
-        search_class_label.grid(row=4, column=0, padx=15, pady=(10, 5), sticky="w")
+        search_class_label.grid(row=6, column=0, padx=15, pady=(10, 5), sticky="w")
 
         self.search_class_frame = ctk.CTkFrame(self.search_left_frame, fg_color=ColorConfig.SECONDARY_FG, corner_radius=12)
-        self.search_class_frame.grid(row=5, column=0, padx=15, pady=(5, 10), sticky="ew")
+        self.search_class_frame.grid(row=7, column=0, padx=15, pady=(5, 10), sticky="ew")
         self.search_class_frame.grid_columnconfigure(0, weight=1)
 
         self.search_class_entry = ctk.CTkEntry(self.search_class_frame, placeholder_text="Select or type class...", width=240, height=34,
@@ -483,43 +586,372 @@ class App(ctk.CTk):
         self.search_class_dropdown = ctk.CTkScrollableFrame(self.search_class_frame, fg_color=ColorConfig.SECONDARY_FG, corner_radius=12, width=240, height=140)
         self.search_class_dropdown.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
         self.search_class_dropdown.grid_remove()  # Hidden initially
-        self.populate_search_class_dropdown(self.character_classes)
+        self.search_class_buttons = self.create_class_buttons(self.search_class_dropdown, self.select_search_class)
 
         # Search Button
         self.search_button = ctk.CTkButton(self.search_left_frame, text="Search \u2315", width=240, height=34,
                                         command=self.update_search_results,
                                         font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
-        self.search_button.grid(row=6, column=0, padx=15, pady=(10, 15), sticky="ew")
+        self.search_button.grid(row=8, column=0, padx=15, pady=(10, 15), sticky="ew")
 
         # Right Panel: Item Results
-        self.search_right_frame = ctk.CTkScrollableFrame(tab_frame, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG)
+        self.search_right_frame = ctk.CTkFrame(tab_frame, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG)
         self.search_right_frame.grid(row=0, column=1, padx=15, pady=15, sticky="nsew")
         self.search_right_frame.grid_columnconfigure(0, weight=1)
+        self.search_right_frame.grid_rowconfigure(3, weight=1)
 
         self.search_results_title = ctk.CTkLabel(self.search_right_frame, text="Item Results", font=(self.label_font, 14, "bold"), text_color=ColorConfig.ACCENT)
         self.search_results_title.grid(row=0, column=0, pady=(15, 5), padx=15)
         self.search_results_desc = ctk.CTkLabel(self.search_right_frame, text="Items matching selected stats and class.", font=self.desc_font, text_color=ColorConfig.TEXT)
         self.search_results_desc.grid(row=1, column=0, pady=(0, 10), padx=15)
 
-        self.search_results_widgets = []
+        # Ranking: keep only the top k items by a computed stat for the loaded character
+        self.search_rank_frame = ctk.CTkFrame(self.search_right_frame, fg_color="transparent")
+        self.search_rank_frame.grid(row=2, column=0, padx=15, pady=(0, 5), sticky="ew")
+        self.search_rank_frame.grid_columnconfigure(0, weight=1)
 
-    def populate_class_dropdown(self, classes):
-        for widget in self.char_class_dropdown.winfo_children():
-            widget.destroy()
-        for i, class_name in enumerate(classes):
-            btn = ctk.CTkButton(self.char_class_dropdown, text=class_name, font=self.entry_font, fg_color=ColorConfig.SECONDARY_FG,
-                                hover_color=ColorConfig.LISTBOX_HOVER, text_color=ColorConfig.TEXT, anchor="w",
-                                command=lambda c=class_name: self.select_class(c))
-            btn.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
+        self.search_rank_option = ctk.CTkOptionMenu(
+            self.search_rank_frame,
+            values=["No Ranking"] + [listbox_stat for listbox_stat, _, _ in stats],
+            font=self.entry_font,
+            fg_color=ColorConfig.SECONDARY_FG,
+            button_color=ColorConfig.ACCENT,
+            button_hover_color=ColorConfig.HOVER,
+            dropdown_fg_color=ColorConfig.SECONDARY_FG,
+            dropdown_hover_color=ColorConfig.LISTBOX_HOVER,
+            dropdown_text_color=ColorConfig.TEXT,
+            text_color=ColorConfig.TEXT,
+            width=200
+        )
+        self.search_rank_option.grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        self.search_rank_option.set("No Ranking")
 
-    def populate_search_class_dropdown(self, classes):
-        for widget in self.search_class_dropdown.winfo_children():
+        self.search_rank_mode_option = ctk.CTkOptionMenu(
+            self.search_rank_frame,
+            values=["Stat Value", "Damage Difference"],
+            font=self.entry_font,
+            fg_color=ColorConfig.SECONDARY_FG,
+            button_color=ColorConfig.ACCENT,
+            button_hover_color=ColorConfig.HOVER,
+            dropdown_fg_color=ColorConfig.SECONDARY_FG,
+            dropdown_hover_color=ColorConfig.LISTBOX_HOVER,
+            dropdown_text_color=ColorConfig.TEXT,
+            text_color=ColorConfig.TEXT,
+            width=150
+        )
+        self.search_rank_mode_option.grid(row=0, column=1, padx=5)
+        self.search_rank_mode_option.set("Stat Value")
+
+        self.search_top_k_entry = ctk.CTkEntry(self.search_rank_frame, placeholder_text="Top", width=60, height=30,
+                                            border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+        self.search_top_k_entry.grid(row=0, column=2, padx=(5, 0))
+        self.search_top_k_entry.insert(0, "20")
+
+        # Searches run on a worker; only the result of the latest one is shown
+        self.search_after_id = None
+        self.search_job = None
+        self.search_generation = 0
+
+        # Results: a fixed pool of rows rebound to whichever items are scrolled into view
+        self.search_matched_items = []
+        self.search_score_texts = {}
+        self.search_result_rows = []
+        self.search_results_list = VirtualList(self.search_right_frame, self.create_search_result_row, self.bind_search_result_row,
+                                               SEARCH_RESULT_ROW_HEIGHT, fg_color="transparent")
+        self.search_results_list.grid(row=3, column=0, sticky="nsew")
+        self.no_results_label = ctk.CTkLabel(self.search_right_frame, text="No items found.", font=self.entry_font, text_color=ColorConfig.TEXT)
+
+    def create_optimizer_tab(self):
+        tab_frame = self.optimizer_tab_frame
+        tab_frame.grid_columnconfigure(0, weight=0)
+        tab_frame.grid_columnconfigure(1, weight=1)
+        tab_frame.grid_rowconfigure(0, weight=1)
+
+        # Left Panel: Optimizer Settings
+        self.optimizer_left_frame = ctk.CTkFrame(tab_frame, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG)
+        self.optimizer_left_frame.grid(row=0, column=0, padx=15, pady=15, sticky="nsew")
+        self.optimizer_left_frame.grid_columnconfigure(0, weight=1)
+
+        title = ctk.CTkLabel(self.optimizer_left_frame, text="Gear Optimizer", font=(self.label_font, 14, "bold"), text_color=ColorConfig.ACCENT)
+        title.grid(row=0, column=0, pady=(15, 5), padx=15)
+        desc = ctk.CTkLabel(self.optimizer_left_frame, text="Find the best item set for a saved character.", font=self.desc_font, text_color=ColorConfig.TEXT)
+        desc.grid(row=1, column=0, pady=(0, 10), padx=15)
+
+        self.optimizer_char_entry = ctk.CTkEntry(self.optimizer_left_frame, placeholder_text="Enter Character Name", width=240, height=34,
+                                                border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+        self.optimizer_char_entry.grid(row=2, column=0, padx=15, pady=10, sticky="ew")
+        self.optimizer_char_entry.bind("<FocusIn>", lambda e: self.optimizer_char_entry.configure(border_color=ColorConfig.BORDER_FOCUS))
+        self.optimizer_char_entry.bind("<FocusOut>", lambda e: self.optimizer_char_entry.configure(border_color=ColorConfig.BORDER_DEFAULT))
+
+        self.optimizer_objective_option = ctk.CTkOptionMenu(
+            self.optimizer_left_frame,
+            values=[PHYSICAL_DAMAGE, MAGICAL_DAMAGE] + [listbox_stat for listbox_stat, _, _ in stats],
+            font=self.entry_font,
+            fg_color=ColorConfig.SECONDARY_FG,
+            button_color=ColorConfig.ACCENT,
+            button_hover_color=ColorConfig.HOVER,
+            dropdown_fg_color=ColorConfig.SECONDARY_FG,
+            dropdown_hover_color=ColorConfig.LISTBOX_HOVER,
+            dropdown_text_color=ColorConfig.TEXT,
+            text_color=ColorConfig.TEXT,
+            width=240
+        )
+        self.optimizer_objective_option.grid(row=3, column=0, padx=15, pady=10, sticky="ew")
+        self.optimizer_objective_option.set("物理攻击力 (Physical Attack Power)")
+
+        button_frame = ctk.CTkFrame(self.optimizer_left_frame, fg_color="transparent")
+        button_frame.grid(row=4, column=0, padx=15, pady=10, sticky="ew")
+        button_frame.grid_columnconfigure((0, 1), weight=1)
+
+        self.optimizer_run_btn = ctk.CTkButton(button_frame, text="Optimize", width=110, command=self.run_optimizer,
+                                            font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        self.optimizer_run_btn.grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        self.optimizer_cancel_btn = ctk.CTkButton(button_frame, text="Cancel", width=110, command=self.cancel_optimizer, state="disabled",
+                                                font=self.button_font, corner_radius=12, fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        self.optimizer_cancel_btn.grid(row=0, column=1, padx=(5, 0), sticky="ew")
+
+        self.optimizer_progress = ctk.CTkProgressBar(self.optimizer_left_frame, width=240, progress_color=ColorConfig.ACCENT)
+        self.optimizer_progress.grid(row=5, column=0, padx=15, pady=10, sticky="ew")
+        self.optimizer_progress.set(0)
+
+        # Right Panel: Optimizer Results
+        self.optimizer_right_frame = ctk.CTkScrollableFrame(tab_frame, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG)
+        self.optimizer_right_frame.grid(row=0, column=1, padx=15, pady=15, sticky="nsew")
+        self.optimizer_right_frame.grid_columnconfigure(0, weight=1)
+
+        self.optimizer_results_title = ctk.CTkLabel(self.optimizer_right_frame, text="Best Items", font=(self.label_font, 14, "bold"), text_color=ColorConfig.ACCENT)
+        self.optimizer_results_title.grid(row=0, column=0, columnspan=2, pady=(15, 5), padx=15)
+
+        self.optimizer_job = None
+        self.optimizer_item_records = ItemRecords()  # parsed items, reused by later runs
+        self.optimizer_results_widgets = []
+
+    def run_optimizer(self):
+        if self.optimizer_job is not None and self.optimizer_job.running:
+            return
+        char_name = self.optimizer_char_entry.get() or self.char_name_entry.get()
+        if char_name not in self.database["characters"]:
+            self.status_label.configure(text=f"Character '{char_name}' not found in database.")
+            return
+        if not self.ensure_classes_loaded(self.database["characters"][char_name].get("class", "All"), then=self.run_optimizer):
+            return
+        objective = self.optimizer_objective_option.get()
+        # Shallow snapshot: saves made while the job runs replace records rather than mutate them.
+        database = {"items": dict(self.database["items"]), "characters": dict(self.database["characters"])}
+        item_records = self.optimizer_item_records
+
+        self.optimizer_progress.set(0)
+        self.optimizer_run_btn.configure(state="disabled")
+        self.optimizer_cancel_btn.configure(state="normal")
+        self.status_label.configure(text=f"Optimizing {objective} for {char_name}...")
+        self.optimizer_job = BackgroundJob(
+            self,
+            lambda job: optimize_gear(database, char_name, objective, job, item_records=item_records),
+            on_progress=self.on_optimizer_progress,
+            on_done=lambda result: self.on_optimizer_done(char_name, objective, result),
+            on_error=self.on_optimizer_error
+        ).start()
+
+    def cancel_optimizer(self):
+        if self.optimizer_job is not None and self.optimizer_job.running:
+            self.optimizer_job.cancel()
+            self.status_label.configure(text="Cancelling optimizer...")
+
+    def on_optimizer_progress(self, done, total):
+        self.optimizer_progress.set(done / total)
+        self.status_label.configure(text=f"Optimizing... {done}/{total}")
+
+    def on_optimizer_error(self, error):
+        print(f"Error in optimizer: {error}")
+        self.optimizer_run_btn.configure(state="normal")
+        self.optimizer_cancel_btn.configure(state="disabled")
+        self.status_label.configure(text="Optimizer failed")
+
+    def on_optimizer_done(self, char_name, objective, result):
+        self.optimizer_run_btn.configure(state="normal")
+        self.optimizer_cancel_btn.configure(state="disabled")
+        for widget in self.optimizer_results_widgets:
             widget.destroy()
-        for i, class_name in enumerate(classes):
-            btn = ctk.CTkButton(self.search_class_dropdown, text=class_name, font=self.entry_font, fg_color=ColorConfig.SECONDARY_FG,
+        self.optimizer_results_widgets.clear()
+        if result.cancelled:
+            self.status_label.configure(text="Optimizer cancelled")
+            return
+
+        self.optimizer_progress.set(1)
+        summary = ctk.CTkLabel(self.optimizer_right_frame, text=f"{char_name}: {objective} = {result.value:g}",
+                               font=self.entry_font, text_color=ColorConfig.TEXT)
+        summary.grid(row=1, column=0, columnspan=2, padx=15, pady=(0, 10), sticky="w")
+        self.optimizer_results_widgets.append(summary)
+        for row, (slot, item_index) in enumerate(result.items, start=2):
+            item_label = ctk.CTkLabel(self.optimizer_right_frame, text=f"{slot}: {item_index}", font=self.entry_font, text_color=ColorConfig.TEXT)
+            item_label.grid(row=row, column=0, padx=15, pady=3, sticky="w")
+            add_button = ctk.CTkButton(self.optimizer_right_frame, text="Add", width=80, command=lambda idx=item_index: self.add_item_to_default(idx),
+                                       font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+            add_button.grid(row=row, column=1, padx=(5, 15), pady=3, sticky="e")
+            self.optimizer_results_widgets.extend([item_label, add_button])
+
+        self.switch_tab("Optimizer")
+        self.status_label.configure(text=f"Optimizer finished: {len(result.items)} item(s), {result.nodes} nodes searched")
+
+    def create_compare_tab(self):
+        tab_frame = self.compare_tab_frame
+        tab_frame.grid_columnconfigure(0, weight=1)
+        tab_frame.grid_rowconfigure(1, weight=1)
+
+        # Top Panel: Compare Controls
+        self.compare_top_frame = ctk.CTkFrame(tab_frame, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG)
+        self.compare_top_frame.grid(row=0, column=0, padx=15, pady=(15, 5), sticky="ew")
+        self.compare_top_frame.grid_columnconfigure(4, weight=1)
+
+        title = ctk.CTkLabel(self.compare_top_frame, text="Upgrade Comparison", font=(self.label_font, 14, "bold"), text_color=ColorConfig.ACCENT)
+        title.grid(row=0, column=0, columnspan=5, pady=(10, 0), padx=15, sticky="w")
+        desc = ctk.CTkLabel(self.compare_top_frame, text="Swap every compatible item into the gear loaded in the Default tab.", font=self.desc_font, text_color=ColorConfig.TEXT)
+        desc.grid(row=1, column=0, columnspan=5, pady=(0, 5), padx=15, sticky="w")
+
+        self.compare_objective_option = ctk.CTkOptionMenu(
+            self.compare_top_frame,
+            values=[listbox_stat for listbox_stat, _, _ in stats],
+            font=self.entry_font,
+            fg_color=ColorConfig.SECONDARY_FG,
+            button_color=ColorConfig.ACCENT,
+            button_hover_color=ColorConfig.HOVER,
+            dropdown_fg_color=ColorConfig.SECONDARY_FG,
+            dropdown_hover_color=ColorConfig.LISTBOX_HOVER,
+            dropdown_text_color=ColorConfig.TEXT,
+            text_color=ColorConfig.TEXT,
+            width=260
+        )
+        self.compare_objective_option.grid(row=2, column=0, padx=(15, 5), pady=(5, 10))
+        self.compare_objective_option.set("物理攻击力 (Physical Attack Power)")
+
+        self.compare_run_btn = ctk.CTkButton(self.compare_top_frame, text="Compare", width=110, command=self.run_comparison,
+                                            font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        self.compare_run_btn.grid(row=2, column=1, padx=5, pady=(5, 10))
+        self.compare_cancel_btn = ctk.CTkButton(self.compare_top_frame, text="Cancel", width=110, command=self.cancel_comparison, state="disabled",
+                                                font=self.button_font, corner_radius=12, fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        self.compare_cancel_btn.grid(row=2, column=2, padx=5, pady=(5, 10))
+
+        self.compare_progress = ctk.CTkProgressBar(self.compare_top_frame, width=200, progress_color=ColorConfig.ACCENT)
+        self.compare_progress.grid(row=2, column=3, padx=(5, 15), pady=(5, 10))
+        self.compare_progress.set(0)
+
+        # Results: a fixed set of rows showing the best swaps so far, refreshed as chunks arrive
+        self.compare_results_frame = ctk.CTkScrollableFrame(tab_frame, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG)
+        self.compare_results_frame.grid(row=1, column=0, padx=15, pady=(5, 15), sticky="nsew")
+        self.compare_results_frame.grid_columnconfigure(0, weight=1)
+
+        self.compare_max_rows = 50
+        self.compare_best = []  # min-heap of (sort key, -arrival, comparison): the best compare_max_rows so far
+        self.compare_count = 0
+        self.compare_row_widgets = []
+        self.compare_job = None
+
+    def run_comparison(self):
+        if self.compare_job is not None and self.compare_job.running:
+            return
+        item_index = self.item_index_entry.get()
+        char_class = self.char_class_entry.get() or "All"
+        if not self.ensure_classes_loaded(char_class, then=self.run_comparison):
+            return
+        item_stats = dict((self.find_item(item_index) or {}).get("stats", {}))
+        item_stats.update(self.item_stats_data)
+        character_stats = dict(self.character_stats_data)
+        char_name = self.char_name_entry.get()
+        objective_stat = self.compare_objective_option.get()
+        database = {"items": dict(self.database["items"]), "characters": dict(self.database["characters"])}
+
+        self.compare_best.clear()
+        self.compare_count = 0
+        self.render_comparisons()
+        self.compare_progress.set(0)
+        self.compare_run_btn.configure(state="disabled")
+        self.compare_cancel_btn.configure(state="normal")
+        self.switch_tab("Compare")
+        self.status_label.configure(text="Comparing items...")
+        self.compare_job = BackgroundJob(
+            self,
+            lambda job: compare_all(database, item_index, item_stats, character_stats, char_name, char_class, objective_stat, job),
+            on_progress=self.on_comparison_progress,
+            on_done=self.on_comparison_done,
+            on_error=self.on_comparison_error
+        ).start()
+
+    def cancel_comparison(self):
+        if self.compare_job is not None and self.compare_job.running:
+            self.compare_job.cancel()
+            self.status_label.configure(text="Cancelling comparison...")
+
+    def on_comparison_progress(self, rows, done, total):
+        self.add_comparisons(rows)
+        self.compare_progress.set(done / total)
+        self.render_comparisons()
+        self.status_label.configure(text=f"Comparing... {done}/{total}")
+
+    def on_comparison_error(self, error):
+        print(f"Error in comparison: {error}")
+        self.compare_run_btn.configure(state="normal")
+        self.compare_cancel_btn.configure(state="disabled")
+        self.status_label.configure(text="Comparison failed")
+
+    def on_comparison_done(self, result):
+        comparisons, cancelled = result
+        self.compare_run_btn.configure(state="normal")
+        self.compare_cancel_btn.configure(state="disabled")
+        self.render_comparisons()  # every chunk was already added through on_comparison_progress
+        self.status_label.configure(text="Comparison cancelled" if cancelled else f"Compared {len(comparisons)} items")
+
+    def add_comparisons(self, rows):
+        # Each row is pushed once into the bounded heap; on equal scores the earlier arrival wins.
+        for comparison in rows:
+            entry = (sort_key(comparison), -self.compare_count, comparison)
+            self.compare_count += 1
+            if len(self.compare_best) < self.compare_max_rows:
+                heapq.heappush(self.compare_best, entry)
+            elif entry > self.compare_best[0]:
+                heapq.heapreplace(self.compare_best, entry)
+
+    def render_comparisons(self):
+        best = [comparison for _, _, comparison in sorted(self.compare_best, reverse=True)]
+        while len(self.compare_row_widgets) < len(best):
+            row = len(self.compare_row_widgets)
+            label = ctk.CTkLabel(self.compare_results_frame, text="", font=self.entry_font, text_color=ColorConfig.TEXT, anchor="w", justify="left")
+            button = ctk.CTkButton(self.compare_results_frame, text="Add", width=80,
+                                   font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+            self.compare_row_widgets.append((row, label, button))
+
+        for position, (row, label, button) in enumerate(self.compare_row_widgets):
+            if position >= len(best):
+                label.grid_remove()
+                button.grid_remove()
+                continue
+            comparison = best[position]
+            deltas = sorted(comparison.deltas.items(), key=lambda delta: abs(delta[1]), reverse=True)[:3]
+            delta_text = ", ".join(f"{STAT_REGISTRY.display_name(stat, self.current_language)} {value:+g}" for stat, value in deltas)
+            label.configure(text=f"{comparison.item_index}   {comparison.difference}   {delta_text}")
+            label.grid(row=row, column=0, padx=(15, 5), pady=3, sticky="w")
+            button.configure(command=lambda idx=comparison.item_index: self.add_item_to_default(idx))
+            button.grid(row=row, column=1, padx=(5, 15), pady=3, sticky="e")
+
+    def create_class_buttons(self, dropdown, command):
+        # One button per class, created once; filtering only grids or hides them
+        buttons = []
+        for i, class_name in enumerate(self.character_classes):
+            btn = ctk.CTkButton(dropdown, text=class_name, font=self.entry_font, fg_color=ColorConfig.SECONDARY_FG,
                                 hover_color=ColorConfig.LISTBOX_HOVER, text_color=ColorConfig.TEXT, anchor="w",
-                                command=lambda c=class_name: self.select_search_class(c))
+                                command=lambda c=class_name: command(c))
             btn.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
+            buttons.append(btn)
+        return buttons
+
+    def show_matches(self, name, rows, matched):
+        # rows: widgets in index order, all gridded until first filtered. Rows keep
+        # their grid row when hidden, so showing one again puts it back in place.
+        shown = self.filter_shown.get(name, frozenset(range(len(rows))))
+        for row_id in shown - matched:
+            rows[row_id].grid_remove()
+        for row_id in sorted(matched - shown):
+            rows[row_id].grid()
+        self.filter_shown[name] = matched
 
     def show_class_dropdown(self):
         self.char_class_dropdown.grid()
@@ -533,117 +965,224 @@ class App(ctk.CTk):
         self.char_class_entry.delete(0, "end")
         self.char_class_entry.insert(0, class_name)
         self.char_class_dropdown.grid_remove()
+        self.ensure_classes_loaded(class_name)
+
     def select_search_class(self, class_name):
         self.search_class_entry.delete(0, "end")
         self.search_class_entry.insert(0, class_name)
         self.search_class_dropdown.grid_remove()
+        if self.ensure_classes_loaded(class_name, then=self.schedule_search):
+            self.schedule_search()
 
     def filter_combobox_values(self, input_text):
-        input_text = input_text.lower()
-        filtered_classes = [c for c in self.character_classes if input_text in c.lower()]
-        self.populate_class_dropdown(filtered_classes)
+        self.show_matches("class", self.char_class_buttons, self.class_index.match(input_text))
 
     def filter_search_combobox_values(self, input_text):
-        input_text = input_text.lower()
-        filtered_classes = [c for c in self.character_classes if input_text in c.lower()]
-        self.populate_search_class_dropdown(filtered_classes)
+        self.show_matches("search class", self.search_class_buttons, self.class_index.match(input_text))
 
     def filter_stats(self, event=None):
         if not self.winfo_exists():
             return
-        filter_text = self.filter_entry.get().lower()
-        current_selected_indices = self.listbox.curselection()
-        current_selected_stats = {self.listbox.get(i) for i in current_selected_indices}
-
-        for _ in range(self.listbox.size()):
-            self.listbox.delete(0)
-
-        filtered_stats = [
-            (listbox_stat, cn, en) for listbox_stat, cn, en in stats
-            if filter_text in listbox_stat.lower()
-        ]
-
-        for i, (listbox_stat, _, _) in enumerate(filtered_stats):
-            self.listbox.insert(i, listbox_stat)
-            if listbox_stat in current_selected_stats:
-                self.listbox.select(i)
+        # Hidden stats stay selected, so clearing the filter brings back the same selection
+        self.show_matches("stats", list(self.listbox.buttons.values()), self.stat_index.match(self.filter_entry.get()))
 
     def filter_search_stats(self, event=None):
         if not self.winfo_exists():
             return
-        filter_text = self.search_filter_entry.get().lower()
-        current_selected_indices = self.search_listbox.curselection()
-        current_selected_stats = {self.search_listbox.get(i) for i in current_selected_indices}
-
-        for _ in range(self.search_listbox.size()):
-            self.search_listbox.delete(0)
+        self.show_matches("search stats", list(self.search_listbox.buttons.values()),
+                          self.stat_index.match(self.search_filter_entry.get()))
 
-        filtered_stats = [
-            (listbox_stat, cn, en) for listbox_stat, cn, en in stats
-            if filter_text in listbox_stat.lower()
-        ]
+    def set_search_range(self):
+        selected_stats = [self.search_listbox.get(i) for i in self.search_listbox.curselection()]
+        if not selected_stats:
+            self.status_label.configure(text="Select stats to set a range")
+            return
+        try:
+            minimum = float(self.search_min_entry.get()) if self.search_min_entry.get() else None
+            maximum = float(self.search_max_entry.get()) if self.search_max_entry.get() else None
+        except ValueError:
+            self.status_label.configure(text="Invalid range value")
+            return
 
-        for i, (listbox_stat, _, _) in enumerate(filtered_stats):
-            self.search_listbox.insert(i, listbox_stat)
-            if listbox_stat in current_selected_stats:
-                self.search_listbox.select(i)
+        for stat in selected_stats:
+            if minimum is None and maximum is None:
+                self.search_ranges.pop(stat, None)
+            else:
+                self.search_ranges[stat] = (minimum, maximum)
+        self.update_search_range_label()
+        self.status_label.configure(text=f"Range set for {len(selected_stats)} stat(s)")
+        self.schedule_search()
+
+    def update_search_range_label(self):
+        if not self.search_ranges:
+            self.search_range_label.configure(text="No range filters")
+            return
+        parts = []
+        for stat, (minimum, maximum) in self.search_ranges.items():
+            display_stat = STAT_REGISTRY.display_name(stat, self.current_language)
+            if minimum is not None and maximum is not None:
+                parts.append(f"{minimum:g} ≤ {display_stat} ≤ {maximum:g}")
+            elif minimum is not None:
+                parts.append(f"{display_stat} ≥ {minimum:g}")
+            else:
+                parts.append(f"{display_stat} ≤ {maximum:g}")
+        self.search_range_label.configure(text="\n".join(parts))
+
+    def schedule_search(self):
+        # Debounced: every call restarts the wait, so a burst of clicks or keystrokes
+        # runs one search.
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.update_search_results)
 
     def update_search_results(self):
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        if not self.database_loaded:
+            # Searched while a load runs: search again once it is in
+            if self.update_search_results not in self.after_load_callbacks:
+                self.after_load_callbacks.append(self.update_search_results)
+            return
         selected_stats = [self.search_listbox.get(i) for i in self.search_listbox.curselection()]
         selected_class = self.search_class_entry.get()
+        if not self.ensure_classes_loaded(selected_class, then=self.update_search_results):
+            return
 
-        # Clear previous results
-        for widget in self.search_results_widgets:
-            widget.grid_forget()
-        self.search_results_widgets.clear()
-
-        # Search for matching items
-        matched_items = self.calculator.search_items(selected_stats, selected_class)
-
-        # Display results
-        row = 2
-        for item_index, item_data in matched_items:
-            item_frame = ctk.CTkFrame(self.search_right_frame, fg_color=ColorConfig.SECONDARY_FG, corner_radius=12)
-            item_frame.grid(row=row, column=0, padx=15, pady=10, sticky="ew")
-            item_frame.grid_columnconfigure(0, weight=1)
-            item_frame.grid_columnconfigure(1, weight=0)
-
-            item_index_entry = ctk.CTkEntry(item_frame, width=180, height=34, border_width=1, corner_radius=12,
-                                            fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
-            item_index_entry.grid(row=0, column=0, padx=(10, 5), pady=5, sticky="w")
-            item_index_entry.insert(0, item_index)
-            item_index_entry.configure(state="disabled")
-
-            add_button = ctk.CTkButton(item_frame, text="Add", width=80, command=lambda idx=item_index: self.add_item_to_default(idx),
-                                    font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
-            add_button.grid(row=0, column=1, padx=(5, 10), pady=5, sticky="e")
-
-            for i, (stat, value) in enumerate(item_data.get("stats", {}).items()):
-                listbox_stat, cn_stat, en_stat = next((l, c, e) for l, c, e in stats if l == stat)
-                display_stat = cn_stat if self.current_language == "zh-cn" else en_stat
-                stat_label = ctk.CTkLabel(item_frame, text=display_stat, font=self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font, text_color=ColorConfig.TEXT)
-                stat_label.grid(row=i + 1, column=0, padx=(15, 5), pady=3, sticky="w")
-
-                stat_entry = ctk.CTkEntry(item_frame, width=140, height=34, border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
-                stat_entry.grid(row=i + 1, column=1, padx=(5, 15), pady=3, sticky="w")
-                stat_entry.insert(0, value)
-                stat_entry.configure(state="disabled")
-
-                self.search_results_widgets.extend([stat_label, stat_entry])
-
-            class_label = ctk.CTkLabel(item_frame, text=f"Class: {item_data.get('class', 'All')}", font=self.entry_font, text_color=ColorConfig.TEXT)
-            class_label.grid(row=len(item_data.get("stats", {})) + 1, column=0, columnspan=2, padx=15, pady=(5, 10), sticky="w")
-
-            self.search_results_widgets.extend([item_frame, item_index_entry, add_button, class_label])
-            row += 1
-
-        if not matched_items:
-            no_results_label = ctk.CTkLabel(self.search_right_frame, text="No items found.", font=self.entry_font, text_color=ColorConfig.TEXT)
-            no_results_label.grid(row=2, column=0, padx=15, pady=10, sticky="w")
-            self.search_results_widgets.append(no_results_label)
+        # Everything the query needs is read from the widgets here, on the Tk thread
+        ranges = dict(self.search_ranges)
+        ranking = self.search_ranking() if self.search_rank_option.get() != "No Ranking" else None
+        calculator = self.calculator
+        if self.search_job is not None and self.search_job.running:
+            self.search_job.cancel()
+        self.search_generation += 1
+        generation = self.search_generation
+        self.status_label.configure(text="Searching...")
+        self.search_job = BackgroundJob(
+            self,
+            lambda job: self.run_search(job, calculator, selected_stats, selected_class, ranges, ranking),
+            on_done=lambda result: self.on_search_done(generation, result),
+            on_error=lambda error: self.on_search_error(generation, error)
+        ).start()
+
+    def run_search(self, job, calculator, selected_stats, selected_class, ranges, ranking):
+        # Runs on the search thread; a superseded search stops at its next check of job.cancelled.
+        cancelled = lambda: job.cancelled
+        matched_items = calculator.search_items(selected_stats, selected_class, ranges, cancelled)
+        if matched_items is None:
+            return None
+        score_texts = {}
+        if ranking is not None:
+            ranked = self.rank_search_results(calculator.database, matched_items, *ranking, cancelled=cancelled)
+            if ranked is None:
+                return None
+            matched_items, score_texts = ranked
+        return matched_items, score_texts
+
+    def on_search_done(self, generation, result):
+        if generation != self.search_generation or result is None:
+            return  # superseded by a newer search
+        matched_items, score_texts = result
+
+        # Display results: only the visible rows are bound
+        self.search_matched_items = matched_items
+        self.search_score_texts = score_texts
+        self.search_results_list.set_items(matched_items)
+        if matched_items:
+            self.no_results_label.grid_remove()
+        else:
+            self.no_results_label.grid(row=3, column=0, padx=15, pady=10, sticky="nw")
 
         self.status_label.configure(text="Search completed")
 
+    def on_search_error(self, generation, error):
+        print(f"Error searching: {error}")
+        if generation == self.search_generation:
+            self.status_label.configure(text="Search failed")
+
+    def create_search_result_row(self, parent):
+        item_frame = ctk.CTkFrame(parent, fg_color=ColorConfig.SECONDARY_FG, corner_radius=12)
+        item_frame.grid_columnconfigure(0, weight=1)
+        item_frame.grid_columnconfigure(1, weight=0)
+
+        item_index_entry = ctk.CTkEntry(item_frame, width=180, height=34, border_width=1, corner_radius=12,
+                                        fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+        item_index_entry.grid(row=0, column=0, padx=(10, 5), pady=5, sticky="w")
+
+        add_button = ctk.CTkButton(item_frame, text="Add", width=80,
+                                font=self.button_font, corner_radius=12, fg_color=ColorConfig.ACCENT, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON)
+        add_button.grid(row=0, column=1, padx=(5, 10), pady=5, sticky="e")
+
+        class_label = ctk.CTkLabel(item_frame, text="", font=self.entry_font, text_color=ColorConfig.TEXT)
+        for widget in (item_frame, item_index_entry, add_button, class_label):
+            self.widgets.track("search results", widget)
+        # stat (label, entry) pairs grow to the most stats shown in this row and are reused
+        self.search_result_rows.append((item_frame, item_index_entry, add_button, class_label, []))
+        return item_frame
+
+    def bind_search_result_row(self, slot, matched_item):
+        item_index, item_data = matched_item
+        item_frame, item_index_entry, add_button, class_label, stat_widgets = self.search_result_rows[slot]
+        item_index_entry.configure(state="normal")
+        item_index_entry.delete(0, "end")
+        item_index_entry.insert(0, item_index)
+        item_index_entry.configure(state="disabled")
+        add_button.configure(command=lambda idx=item_index: self.add_item_to_default(idx))
+
+        item_stats = item_data.get("stats", {})
+        label_font = self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font
+        while len(stat_widgets) < len(item_stats):
+            stat_label = ctk.CTkLabel(item_frame, text="", text_color=ColorConfig.TEXT)
+            stat_entry = ctk.CTkEntry(item_frame, width=140, height=34, border_width=1, corner_radius=12, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+            self.widgets.track("search results", stat_label)
+            self.widgets.track("search results", stat_entry)
+            stat_widgets.append((stat_label, stat_entry))
+        for i, (stat_label, stat_entry) in enumerate(stat_widgets):
+            if i >= len(item_stats):
+                stat_label.grid_remove()
+                stat_entry.grid_remove()
+        for i, (stat, value) in enumerate(item_stats.items()):
+            stat_label, stat_entry = stat_widgets[i]
+            stat_label.configure(text=STAT_REGISTRY.display_name(stat, self.current_language), font=label_font)
+            stat_label.grid(row=i + 1, column=0, padx=(15, 5), pady=3, sticky="w")
+            stat_entry.configure(state="normal")
+            stat_entry.delete(0, "end")
+            stat_entry.insert(0, value)
+            stat_entry.configure(state="disabled")
+            stat_entry.grid(row=i + 1, column=1, padx=(5, 15), pady=3, sticky="w")
+
+        class_text = f"Class: {item_data.get('class', 'All')}"
+        if item_index in self.search_score_texts:
+            class_text += f"    Score: {self.search_score_texts[item_index]}"
+        class_label.configure(text=class_text)
+        class_label.grid(row=len(item_stats) + 1, column=0, columnspan=2, padx=15, pady=(5, 10), sticky="w")
+
+    def search_ranking(self):
+        # rank_search_results arguments after the item list, read from the ranking widgets
+        try:
+            k = max(1, int(self.search_top_k_entry.get()))
+        except ValueError:
+            k = 20
+        reference_item_stats = None
+        if self.search_rank_mode_option.get() == "Damage Difference":
+            reference_item_stats = dict((self.find_item(self.item_index_entry.get()) or {}).get("stats", {}))
+            reference_item_stats.update(self.item_stats_data)
+        return (self.search_rank_option.get(), k, dict(self.character_stats_data), self.char_name_entry.get(),
+                reference_item_stats)
+
+    @staticmethod
+    def rank_search_results(database, matched_items, objective_stat, k, character_stats, char_name, reference_item_stats,
+                            cancelled=None):
+        ranker = StatCalculator(character_stats=character_stats, database=database, char_name=char_name)
+        ranked = ranker.rank_items(matched_items, objective_stat, k, reference_item_stats, cancelled)
+        if ranked is None:
+            return None
+        score_texts = {
+            item_index: f"{value:g} ({difference})" if difference is not None else f"{value:g}"
+            for item_index, _, value, difference in ranked
+        }
+        return [(item_index, item_data) for item_index, item_data, _, _ in ranked], score_texts
+
     def add_item_to_default(self, item_index):
         if item_index in self.database["items"]:
             # Clear current item stats in Default tab
@@ -658,9 +1197,9 @@ class App(ctk.CTk):
             for stat, value in item_data.get("stats", {}).items():
                 if stat not in self.selected_stats:
                     self.selected_stats.append(stat)
-                    self.add_stat_to_ui(stat, len(self.selected_stats) - 1)
-                    self.item_stats_entries[-1].delete(0, "end")
-                    self.item_stats_entries[-1].insert(0, str(value))
+                    row = self.add_stat_to_ui(stat, len(self.selected_stats) - 1)
+                    row.item_entry.delete(0, "end")
+                    row.item_entry.insert(0, str(value))
                     self.item_stats_data[stat] = str(value)
                     self._record_action("add_stat", {"stat": stat, "index": len(self.selected_stats) - 1})
 
@@ -712,10 +1251,8 @@ class App(ctk.CTk):
         if not self.winfo_exists():
             return
         try:
-            for i in range(self.listbox.size()):
-                self.listbox.delete(0)
-            for i, (listbox_stat, _, _) in enumerate(stats):
-                self.listbox.insert(i, listbox_stat)
+            for i in self.listbox.curselection():
+                self.listbox.deselect(i)
 
             self.selected_stats.clear()
             self.item_stats_data.clear()
@@ -725,15 +1262,18 @@ class App(ctk.CTk):
             self.char_class_entry.delete(0, "end")
             self.char_class_entry.insert(0, "All")
             self.filter_entry.delete(0, "end")
+            self.filter_stats()
             self.rebuild_ui()
             self.reset_critical_damage()
             self.reset_damage_difference()
-            for i in range(self.search_listbox.size()):
-                self.search_listbox.delete(0)
-            for i, (listbox_stat, _, _) in enumerate(stats):
-                self.search_listbox.insert(i, listbox_stat)
+            for i in self.search_listbox.curselection():
+                self.search_listbox.deselect(i)
             self.search_class_entry.delete(0, "end")
             self.search_class_entry.insert(0, "All")
+            self.search_ranges.clear()
+            self.search_min_entry.delete(0, "end")
+            self.search_max_entry.delete(0, "end")
+            self.update_search_range_label()
             self.update_search_results()
             self.history.clear()
             self.redo_stack.clear()
@@ -767,51 +1307,107 @@ class App(ctk.CTk):
             print(f"Error in on_add: {e}")
 
     def add_stat_to_ui(self, stat, index):
+        # Creates the row for stat, which is already in self.selected_stats at index.
+        # Rows below an insertion move down a grid row; no other row is touched.
         if not self.winfo_exists():
-            return
-        row = index + 3  # Start after item index/load in side_2_frame
-        listbox_stat, cn_stat, en_stat = next((l, c, e) for l, c, e in stats if l == stat)
-        display_stat = cn_stat if self.current_language == "zh-cn" else en_stat
+            return None
+        display_stat = STAT_REGISTRY.display_name(stat, self.current_language)
         current_font = self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font
 
         # Item side
-        item_label = ctk.CTkLabel(self.side_2_frame, text=display_stat, font=current_font, text_color=ColorConfig.TEXT)
-        item_label.grid(row=row, column=0, padx=(10, 5), pady=2, sticky="w")
-        
-        item_entry = ctk.CTkEntry(self.side_2_frame, width=120, border_width=1, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
-        item_entry.bind("<FocusIn>", lambda e: item_entry.configure(border_color=ColorConfig.BORDER_FOCUS))
-        item_entry.bind("<FocusOut>", lambda e: item_entry.configure(border_color=ColorConfig.BORDER_DEFAULT))
-        item_entry.grid(row=row, column=1, padx=5, pady=2, sticky="ew")
+        item_label = self.widgets.acquire("item stats", "label", lambda: self.create_stat_label(self.side_2_frame))
+        item_label.configure(text=display_stat, font=current_font)
+        item_entry = self.widgets.acquire("item stats", "entry", lambda: self.create_stat_entry(self.side_2_frame, self.update_item_data))
+        item_entry.delete(0, "end")
         if stat in self.item_stats_data:
             item_entry.insert(0, self.item_stats_data[stat])
-        item_entry.bind("<KeyRelease>", lambda e, s=stat: self.update_item_data(s, e.widget.get()))
-        
-        item_remove = ctk.CTkButton(self.side_2_frame, text="−", width=30, command=lambda: self.remove_stat(index),
-                                    fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON, corner_radius=8, font=self.button_font)
-        item_remove.grid(row=row, column=2, padx=(5, 10), pady=2)
+        item_remove = self.widgets.acquire("item stats", "remove", lambda: self.create_stat_remove_button(self.side_2_frame))
 
         # Character side
-        char_label = ctk.CTkLabel(self.side_3_frame, text=display_stat, font=current_font, text_color=ColorConfig.TEXT)
-        char_label.grid(row=row, column=0, padx=(10, 5), pady=2, sticky="w")
-        
-        char_entry = ctk.CTkEntry(self.side_3_frame, width=120, border_width=1, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
-        char_entry.grid(row=row, column=1, padx=5, pady=2, sticky="ew")
-        char_entry.bind("<FocusIn>", lambda e: char_entry.configure(border_color=ColorConfig.BORDER_FOCUS))
-        char_entry.bind("<FocusOut>", lambda e: char_entry.configure(border_color=ColorConfig.BORDER_DEFAULT))
+        char_label = self.widgets.acquire("character stats", "label", lambda: self.create_stat_label(self.side_3_frame))
+        char_label.configure(text=display_stat, font=current_font)
+        char_entry = self.widgets.acquire("character stats", "entry", lambda: self.create_stat_entry(self.side_3_frame, self.update_character_data))
+        char_entry.delete(0, "end")
         if stat in self.character_stats_data:
             char_entry.insert(0, self.character_stats_data[stat])
-        char_entry.bind("<KeyRelease>", lambda e, s=stat: self.update_character_data(s, e.widget.get()))
-        
-        char_remove = ctk.CTkButton(self.side_3_frame, text="−", width=30, command=lambda: self.remove_stat(index),
-                                    fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON, corner_radius=8, font=self.button_font)
-        char_remove.grid(row=row, column=2, padx=(5, 10), pady=2)
-
-        self.item_stat_labels.append(item_label)
-        self.item_stats_entries.append(item_entry)
-        self.item_remove_buttons.append(item_remove)
-        self.character_stat_labels.append(char_label)
-        self.character_stats_entries.append(char_entry)
-        self.character_remove_buttons.append(char_remove)
+        char_remove = self.widgets.acquire("character stats", "remove", lambda: self.create_stat_remove_button(self.side_3_frame))
+
+        # The buttons look their stat's position up when clicked, so they stay right as rows move
+        for button in (item_remove, char_remove):
+            button.configure(command=lambda s=stat: self.remove_stat(self.selected_stats.index(s)))
+        self.entry_stats[item_entry] = stat
+        self.entry_stats[char_entry] = stat
+        row = StatRow(item_label, item_entry, item_remove, char_label, char_entry, char_remove)
+        self.stat_rows[STAT_REGISTRY.register(stat)] = row
+        self.grid_stat_rows(self.selected_stats.index(stat))
+        return row
+
+    def stat_row(self, stat):
+        # Looking a row up never registers the label; only add_stat_to_ui does.
+        row = self.stat_rows.get(STAT_REGISTRY.label_id(stat))
+        if row is None:
+            raise KeyError(f"No stat row for {stat!r}")
+        return row
+
+    @property
+    def item_stats_entries(self):
+        # Item entries in self.selected_stats order
+        return [self.stat_row(stat).item_entry for stat in self.selected_stats]
+
+    @property
+    def character_stats_entries(self):
+        return [self.stat_row(stat).char_entry for stat in self.selected_stats]
+
+    def grid_stat_rows(self, start=0):
+        # (Re-)grids the rows from position start down; stats whose row is not created
+        # yet (rebuild_ui adds them one by one) are skipped.
+        for position in range(start, len(self.selected_stats)):
+            row = self.stat_rows.get(STAT_REGISTRY.label_id(self.selected_stats[position]))
+            if row is None:
+                continue
+            grid_row = position + 3  # Start after item index/load in side_2_frame
+            for label, entry, button in ((row.item_label, row.item_entry, row.item_remove),
+                                         (row.char_label, row.char_entry, row.char_remove)):
+                label.grid(row=grid_row, column=0, padx=(10, 5), pady=2, sticky="w")
+                entry.grid(row=grid_row, column=1, padx=5, pady=2, sticky="ew")
+                button.grid(row=grid_row, column=2, padx=(5, 10), pady=2)
+
+    def create_stat_label(self, frame):
+        return ctk.CTkLabel(frame, text="", text_color=ColorConfig.TEXT)
+
+    def create_stat_entry(self, frame, on_change):
+        # Bindings are made once: the entry may be rebound to other stats later.
+        entry = ctk.CTkEntry(frame, width=120, border_width=1, corner_radius=15, fg_color=ColorConfig.SECONDARY_FG, text_color=ColorConfig.TEXT, font=self.entry_font)
+        entry.bind("<FocusIn>", lambda e: entry.configure(border_color=ColorConfig.BORDER_FOCUS))
+        entry.bind("<FocusOut>", lambda e: entry.configure(border_color=ColorConfig.BORDER_DEFAULT))
+        entry.bind("<KeyRelease>", lambda e: self.on_stat_entry_key(entry, on_change))
+        return entry
+
+    def on_stat_entry_key(self, entry, on_change):
+        # A pooled entry can be released while it still has focus
+        stat = self.entry_stats.get(entry)
+        if stat is None:
+            return
+        on_change(stat, entry.get())
+
+    def create_stat_remove_button(self, frame):
+        return ctk.CTkButton(frame, text="−", width=30,
+                             fg_color=ColorConfig.DIM, hover_color=ColorConfig.HOVER, text_color=ColorConfig.TEXT_BUTTON, corner_radius=8, font=self.button_font)
+
+    def release_stat_row(self, stat_id):
+        # Un-grids the stat's row and returns its widgets to the pool.
+        row = self.stat_rows.pop(stat_id)
+        self.entry_stats.pop(row.item_entry, None)
+        self.entry_stats.pop(row.char_entry, None)
+        self.widgets.release("item stats", "label", row.item_label)
+        self.widgets.release("item stats", "entry", row.item_entry)
+        self.widgets.release("item stats", "remove", row.item_remove)
+        self.widgets.release("character stats", "label", row.char_label)
+        self.widgets.release("character stats", "entry", row.char_entry)
+        self.widgets.release("character stats", "remove", row.char_remove)
+
+    def show_widget_readout(self):
+        self.status_label.configure(text=self.widgets.readout(self))
 
     def update_item_data(self, stat, value):
         if not self.winfo_exists():
@@ -821,6 +1417,8 @@ class App(ctk.CTk):
             self.item_stats_data[stat] = value
         elif stat in self.item_stats_data:
             del self.item_stats_data[stat]
+        if self.build_calculator is not None:
+            self.build_calculator.set_item_value(stat, value)
         self._record_action("update_item", {"stat": stat, "value": value, "previous_value": previous_value})
 
     def update_character_data(self, stat, value):
@@ -832,14 +1430,17 @@ class App(ctk.CTk):
             self.character_stats_data[stat] = value
         elif stat in self.character_stats_data:
             del self.character_stats_data[stat]
+        if self.build_calculator is not None:
+            self.build_calculator.set_character_value(stat, value)
 
     def remove_stat(self, index):
         if not self.winfo_exists():
             return
         if 0 <= index < len(self.selected_stats):
             removed_stat = self.selected_stats[index]
-            item_value = self.item_stats_entries[index].get()
-            char_value = self.character_stats_entries[index].get()
+            row = self.stat_row(removed_stat)
+            item_value = row.item_entry.get()
+            char_value = row.char_entry.get()
             self._record_action("remove_stat", {
                 "stat": removed_stat,
                 "index": index,
@@ -848,45 +1449,14 @@ class App(ctk.CTk):
             })
             self.status_label.configure(text=f"Removed: {removed_stat}")
             self.selected_stats.pop(index)
-            
-            self.item_stat_labels[index].grid_forget()
-            self.item_stats_entries[index].grid_forget()
-            self.item_remove_buttons[index].grid_forget()
-            self.character_stat_labels[index].grid_forget()
-            self.character_stats_entries[index].grid_forget()
-            self.character_remove_buttons[index].grid_forget()
-            
-            self.item_stat_labels.pop(index)
-            self.item_stats_entries.pop(index)
-            self.item_remove_buttons.pop(index)
-            self.character_stat_labels.pop(index)
-            self.character_stats_entries.pop(index)
-            self.character_remove_buttons.pop(index)
-
-            self.rebuild_ui()
+            self.release_stat_row(STAT_REGISTRY.label_id(removed_stat))
+            self.grid_stat_rows(index)
 
     def rebuild_ui(self):
         if not self.winfo_exists():
             return
-        for label in self.item_stat_labels:
-            label.grid_forget()
-        for entry in self.item_stats_entries:
-            entry.grid_forget()
-        for button in self.item_remove_buttons:
-            button.grid_forget()
-        for label in self.character_stat_labels:
-            label.grid_forget()
-        for entry in self.character_stats_entries:
-            entry.grid_forget()
-        for button in self.character_remove_buttons:
-            button.grid_forget()
-        
-        self.item_stat_labels.clear()
-        self.item_stats_entries.clear()
-        self.item_remove_buttons.clear()
-        self.character_stat_labels.clear()
-        self.character_stats_entries.clear()
-        self.character_remove_buttons.clear()
+        for stat_id in list(self.stat_rows):
+            self.release_stat_row(stat_id)
 
         for i, stat in enumerate(self.selected_stats):
             self.add_stat_to_ui(stat, i)
@@ -895,27 +1465,27 @@ class App(ctk.CTk):
         if not self.winfo_exists():
             return
         self.current_language = "zh-cn" if choice == "Chinese (ZH-CN)" else "en"
-        self.update_labels()
-        self.update_search_results()
+        self.update_labels()  # re-renders the search results
         self.status_label.configure(text=f"Language switched to {choice}")
 
     def update_labels(self):
         if not self.winfo_exists():
             return
         # Update stat name labels
-        for i, stat in enumerate(self.selected_stats):
-            _, cn_stat, en_stat = next((l, c, e) for l, c, e in stats if l == stat)
-            display_stat = cn_stat if self.current_language == "zh-cn" else en_stat
-            self.item_stat_labels[i].configure(
+        for stat in self.selected_stats:
+            display_stat = STAT_REGISTRY.display_name(stat, self.current_language)
+            row = self.stat_row(stat)
+            row.item_label.configure(
                 text=display_stat,
                 font=self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font
             )
-            self.character_stat_labels[i].configure(
+            row.char_label.configure(
                 text=display_stat,
                 font=self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font
             )
 
         # Update search results
+        self.update_search_range_label()
         self.update_search_results()
 
         # Update other widgets
@@ -946,16 +1516,16 @@ class App(ctk.CTk):
         if not self.winfo_exists():
             return
         index = self.item_index_entry.get()
-        if index in self.database["items"]:
+        item_data = self.find_item(index)
+        if item_data is not None:
             self.selected_stats.clear()
             self.rebuild_ui()
-            item_data = self.database["items"][index]
             for stat, value in item_data.get("stats", {}).items():
                 if stat not in self.selected_stats:
                     self.selected_stats.append(stat)
-                    self.add_stat_to_ui(stat, len(self.selected_stats) - 1)
-                    self.item_stats_entries[-1].delete(0, "end")
-                    self.item_stats_entries[-1].insert(0, str(value))
+                    row = self.add_stat_to_ui(stat, len(self.selected_stats) - 1)
+                    row.item_entry.delete(0, "end")
+                    row.item_entry.insert(0, str(value))
                     self.item_stats_data[stat] = str(value)
                     self._record_action("add_stat", {"stat": stat, "index": len(self.selected_stats) - 1})
             self.char_class_entry.delete(0, "end")
@@ -974,9 +1544,9 @@ class App(ctk.CTk):
             char_data = self.database["characters"][name]
             for stat, value in char_data.get("stats", {}).items():
                 if stat in current_item_stats:
-                    index = self.selected_stats.index(stat)
-                    self.character_stats_entries[index].delete(0, "end")
-                    self.character_stats_entries[index].insert(0, str(value))
+                    char_entry = self.stat_row(stat).char_entry
+                    char_entry.delete(0, "end")
+                    char_entry.insert(0, str(value))
                     self._record_action("update_character", {
                         "stat": stat,
                         "value": str(value),
@@ -989,12 +1559,202 @@ class App(ctk.CTk):
         else:
             self.status_label.configure(text=f"Character '{name}' not found in database.")
 
-    def save_database(self):
+    def import_database(self):
+        if not self.database_loaded or (self.import_job is not None and self.import_job.running):
+            return
+        if self.save_job is not None and self.save_job.running:
+            self.status_label.configure(text="Wait for the save to finish before importing")
+            return
+        # The import reloads the database from storage, which would drop unsaved records.
+        if self.dirty_items or self.dirty_characters:
+            self.status_label.configure(text="Save changes before importing")
+            return
+        path = filedialog.askopenfilename(title="Import items and characters",
+                                          filetypes=[("Item dumps", "*.csv *.jsonl *.json"), ("All files", "*.*")])
+        if not path:
+            return
+        self.database_loaded = False
+        for button in (self.item_load_btn, self.char_load_btn, self.search_button, self.save_btn, self.import_btn):
+            button.configure(state="disabled")
+        self.status_label.configure(text="Importing...")
+        self.import_job = BackgroundJob(
+            self,
+            lambda job: import_file(path, self.storage, rejects_path_for(path),
+                                    on_progress=job.report, cancelled=lambda: job.cancelled),
+            on_progress=self.on_import_progress,
+            on_done=lambda result: self.on_import_done(path, result),
+            on_error=self.on_import_error
+        ).start()
+
+    def on_import_progress(self, rows, fraction):
+        self.status_label.configure(text=f"Importing... {rows} rows ({fraction:.0%})")
+
+    def on_import_error(self, error):
+        # Batches written before the error are in storage; reload to pick them up.
+        print(f"Error importing: {error}")
+        self.start_database_load("Import failed", self.loaded_classes)
+
+    def on_import_done(self, path, result):
+        # The importer wrote straight to storage, so the in-memory database is reloaded.
+        message = f"Imported {result.items} items and {result.characters} characters"
+        if result.rejected:
+            message += f", rejected {result.rejected} rows (see {os.path.basename(rejects_path_for(path))})"
+        self.start_database_load(message, self.loaded_classes)
+
+    @staticmethod
+    def shard_classes(*class_names):
+        # Item classes a class filter can match: its own and "All". None means every
+        # class, as filtering by "All" (or nothing) matches items of any class.
+        if any(not class_name or class_name == "All" for class_name in class_names):
+            return None
+        return set(class_names) | {"All"}
+
+    @staticmethod
+    def classes_cover(loaded, classes):
+        return loaded is None or (classes is not None and classes <= loaded)
+
+    def ensure_classes_loaded(self, *class_names, then=None):
+        # True when the loaded shards hold every item class_names can match. Otherwise
+        # the missing shards are loaded in the background, then() runs once they are in,
+        # and False is returned. Half-typed or unknown class names have no shard to load.
+        class_names = [class_name for class_name in class_names
+                       if not class_name or class_name == "All" or class_name in self.character_classes]
+        classes = self.shard_classes(*class_names)
+        if not self.storage.class_shards or self.classes_cover(self.loaded_classes, classes):
+            return True
+        if then is not None and then not in self.after_load_callbacks:
+            self.after_load_callbacks.append(then)
+        if not self.database_loaded and self.classes_cover(self.loading_classes, classes):
+            return False  # the running load brings them in
+        if self.database_loaded:
+            self.start_database_load(classes=None if classes is None else classes | self.loaded_classes)
+        else:
+            # A load is running; on_database_loaded starts another one if it falls short.
+            self.pending_classes = None if classes is None or self.pending_classes is None else self.pending_classes | classes
+        return False
+
+    def start_database_load(self, loaded_text=None, classes=None):
+        # classes: the item classes to load; loaded records are replaced, so this is
+        # also how a shard is added (the classes already loaded are passed along).
+        if not self.storage.class_shards:
+            classes = None
+        self.database_loaded = False
+        self.loading_classes = classes
+        for button in (self.item_load_btn, self.char_load_btn, self.search_button, self.save_btn, self.import_btn):
+            button.configure(state="disabled")
+        if classes is None:
+            self.status_label.configure(text="Loading database...")
+        else:
+            self.status_label.configure(text=f"Loading {', '.join(sorted(classes))} items...")
+        # Records a failed save left dirty are carried over into the reloaded database.
+        unsaved = ({key: self.database["items"].get(key) for key in self.dirty_items},
+                   {key: self.database["characters"].get(key) for key in self.dirty_characters})
+        save_job = self.save_job if self.save_job is not None and self.save_job.running else None
+        self.database_load_job = BackgroundJob(
+            self,
+            lambda job: self.load_database(job, classes, save_job),
+            on_progress=self.on_database_load_progress,
+            on_done=lambda result: self.on_database_loaded(result, loaded_text, unsaved),
+            on_error=self.on_database_load_error
+        ).start()
+
+    def load_database(self, job, classes=None, save_job=None):
+        # Runs on the loader thread: builds everything off to the side and hands it
+        # over in on_database_loaded, so the Tk thread never sees a half-built index.
+        if save_job is not None:
+            save_job.wait()  # its records must be in storage before reading it back
+        sources = self.storage.source_files()
+        key = (snapshot_key(sources), None if classes is None else sorted(classes))
+        snapshot = load_snapshot(self.snapshot_file, key)
+        database, index = snapshot if snapshot is not None else (self.storage.load(classes), None)
+        # config.cat holds every item, so it is only used when everything is loaded. It
+        # replaces building the search index, not the records: search hits, result rows and
+        # edits still read database["items"], so memory still grows with the item count.
+        catalogue = open_catalogue(self.catalogue_file, source_fingerprint(sources)) if classes is None else None
+        if catalogue is not None and catalogue.item_count != len(database["items"]):
+            catalogue.close()
+            catalogue = None
+        if index is None and catalogue is None:
+            index = ItemSearchIndex()
+            items = list(database["items"].items())
+            for start in range(0, len(items), DATABASE_LOAD_CHUNK):
+                if job.cancelled:
+                    return None
+                index.add_items(items[start:start + DATABASE_LOAD_CHUNK])
+                job.report(min(start + DATABASE_LOAD_CHUNK, len(items)), len(items))
+            index.finish_bulk_load()
+        if snapshot is None:
+            save_snapshot(self.snapshot_file, key, database, index)
+        return database, catalogue, index
+
+    def on_database_load_progress(self, done, total):
+        self.status_label.configure(text=f"Indexing items... {done}/{total}")
+
+    def on_database_load_error(self, error):
+        # Save stays disabled: writing back an empty database would lose data.
+        print(f"Error loading database: {error}")
+        self.after_load_callbacks.clear()
+        self.status_label.configure(text="Failed to load database")
+
+    def on_database_loaded(self, result, loaded_text=None, unsaved=({}, {})):
+        if result is None:
+            return
+        if self.catalogue is not None and self.catalogue is not result[1]:
+            self.catalogue.close()
+        self.database, self.catalogue, index = result
+        self.optimizer_item_records = ItemRecords()  # do not hold on to the old records
+        self.search_generation += 1  # a search still running on the old calculator is dropped
+        self.calculator = StatCalculator(database=self.database)
+        if index is not None:
+            self.calculator.set_search_index(index)
+        if self.catalogue is not None:
+            self.calculator.attach_catalogue(self.catalogue)
+        for section, records in zip(("items", "characters"), unsaved):
+            for key, record in records.items():
+                if record is None:
+                    self.database[section].pop(key, None)
+                else:
+                    self.database[section][key] = record
+                if section == "items":
+                    self.calculator.update_item(key)
+        self.loaded_classes = self.loading_classes
+        self.database_loaded = True
+        for button in (self.item_load_btn, self.char_load_btn, self.search_button, self.save_btn, self.import_btn):
+            button.configure(state="normal")
+        self.status_label.configure(text=loaded_text or f"Loaded {len(self.database['items'])} items and "
+                                                         f"{len(self.database['characters'])} characters")
+
+        pending, self.pending_classes = self.pending_classes, set()
+        if not self.classes_cover(self.loaded_classes, pending):
+            self.start_database_load(loaded_text, None if pending is None else pending | self.loaded_classes)
+            return
+        if self.loaded_classes is None and self.catalogue is None and not self.dirty_items:
+            self.save_catalogue()  # missing or stale
+        callbacks, self.after_load_callbacks = self.after_load_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def find_item(self, item_index):
+        # The item's record, looked up in storage when its shard is not loaded.
+        item_data = self.database["items"].get(item_index)
+        if item_data is None and self.loaded_classes is not None and self.storage.class_shards:
+            item_data = self.storage.load_item(item_index)
+        return item_data
+
+    def save_database(self, autosave=False):
+        if not self.database_loaded:
+            if not autosave:
+                self.status_label.configure(text="Database is still loading...")
+            return
         item_index, char_name = self.item_index_entry.get(), self.char_name_entry.get()
         char_class = self.char_class_entry.get()
-        
+
+        # Records are rebuilt from the entries but only marked dirty when they differ
+        # from the stored ones, so loading or re-saving an unchanged record writes nothing.
         if item_index and self.item_stats_entries:
-            self.database["items"][item_index] = {
+            existing_item = self.database["items"].get(item_index, {})
+            item_data = {
+                **existing_item,  # keeps fields the entries do not show, e.g. an imported "slot"
                 "class": char_class,
                 "stats": {
                     stat: (int(val) if val.isdigit() else val)
@@ -1002,7 +1762,12 @@ class App(ctk.CTk):
                     if val
                 }
             }
-        
+            if existing_item != item_data:
+                self.database["items"][item_index] = item_data
+                self.calculator.update_item(item_index)
+                self.dirty_items.add(item_index)
+                self.build_calculator = None  # its results may read the old record
+
         if char_name and self.character_stats_entries:
             existing_char_stats = self.database["characters"].get(char_name, {})
             new_char_stats = {
@@ -1014,29 +1779,101 @@ class App(ctk.CTk):
                 }
             }
             updated_char_stats = {**existing_char_stats, **new_char_stats}
-            self.database["characters"][char_name] = updated_char_stats
-
-        with open(self.database_file, "w", encoding='utf-8') as f:
-            json.dump(self.database, f, indent=4, ensure_ascii=False)
-        
-        self.status_label.configure(text="Database saved successfully.")
+            if existing_char_stats != updated_char_stats:
+                self.database["characters"][char_name] = updated_char_stats
+                self.dirty_characters.add(char_name)
+                self.build_calculator = None
+
+        if self.save_job is not None and self.save_job.running:
+            return  # on_database_saved starts the next write
+        if not self.dirty_items and not self.dirty_characters:
+            if not autosave:
+                self.status_label.configure(text="No changes to save")
+            return
+        self.start_database_save()
+
+    def start_database_save(self):
+        # Hands the dirty records to a worker; records are replaced, never mutated,
+        # so the worker can serialize them while the UI keeps editing the database.
+        items = {key: self.database["items"].get(key) for key in self.dirty_items}
+        characters = {key: self.database["characters"].get(key) for key in self.dirty_characters}
+        self.dirty_items, self.dirty_characters = set(), set()
+        snapshot = None
+        if not self.storage.partial_writes:
+            snapshot = {"items": dict(self.database["items"]), "characters": dict(self.database["characters"])}
+        self.status_label.configure(text="Saving...")
+        self.save_job = BackgroundJob(
+            self,
+            lambda job: self.write_database_records(items, characters, snapshot),
+            on_done=self.on_database_saved,
+            on_error=lambda error: self.on_database_save_error(error, items, characters)
+        ).start()
+
+    def write_database_records(self, items, characters, snapshot=None):
+        # Runs on the save thread.
+        if snapshot is None:
+            self.storage.write_records(items, characters)
+        else:
+            self.storage.save_all(snapshot)
+        return len(items) + len(characters)
+
+    def on_database_saved(self, count):
+        self.status_label.configure(text=f"{count} records saved")
+        self.storage.compact_if_needed(self.database)
+        if self.dirty_items or self.dirty_characters:
+            self.start_database_save()
+
+    def on_database_save_error(self, error, items, characters):
+        # Still dirty: the next save or autosave retries them.
+        print(f"Error saving database: {error}")
+        self.dirty_items.update(items)
+        self.dirty_characters.update(characters)
+        self.status_label.configure(text="Failed to save database")
+
+    def toggle_autosave(self):
+        if self.autosave_after_id is not None:
+            self.after_cancel(self.autosave_after_id)
+            self.autosave_after_id = None
+        if self.autosave_checkbox.get():
+            self.autosave_after_id = self.after(AUTOSAVE_INTERVAL_MS, self.autosave)
+
+    def autosave(self):
+        self.autosave_after_id = None
+        if not self.winfo_exists():
+            return
+        self.save_database(autosave=True)
+        if self.autosave_checkbox.get():
+            self.autosave_after_id = self.after(AUTOSAVE_INTERVAL_MS, self.autosave)
 
     def show_result(self):
         if not self.winfo_exists():
             return
         item_stats = {}
         character_stats = {}
-        for i, stat in enumerate(self.selected_stats):
-            item_value = self.item_stats_entries[i].get()
-            char_value = self.character_stats_entries[i].get()
+        for stat in self.selected_stats:
+            row = self.stat_row(stat)
+            item_value = row.item_entry.get()
+            char_value = row.char_entry.get()
             if item_value:
                 item_stats[stat] = item_value
             if char_value:
                 character_stats[stat] = char_value
 
-        ResultWindow(self, item_stats, character_stats, self.current_language)
+        ResultWindow(self, item_stats, character_stats, self.current_language, self.current_build(item_stats, character_stats))
         self.status_label.configure(text="Result window opened.")
 
+    def current_build(self, item_stats, character_stats):
+        # The build calculator is kept while only stat entries were edited (those go through
+        # set_item_value/set_character_value); any other change starts a fresh one.
+        item_index, char_name = self.item_index_entry.get(), self.char_name_entry.get()
+        build = self.build_calculator
+        if (build is None or build.database is not self.database or build.item_index != item_index
+                or build.char_name != char_name or build.item_stats != item_stats
+                or build.character_stats != character_stats):
+            build = StatCalculator(item_stats, character_stats, self.database, item_index, char_name)
+            self.build_calculator = build
+        return build
+
     def load_session(self):
         if not os.path.exists(self.session_file):
             return
@@ -1051,15 +1888,14 @@ class App(ctk.CTk):
             self.char_name_entry.insert(0, session_data.get("char_name", ""))
             self.char_class_entry.delete(0, "end")
             self.char_class_entry.insert(0, session_data.get("char_class", "All"))
+            self.search_class_entry.delete(0, "end")
+            self.search_class_entry.insert(0, session_data.get("search_class", "All"))
             self.current_tab = session_data.get("current_tab", "Default")
+            if session_data.get("autosave"):
+                self.autosave_checkbox.select()
+                self.toggle_autosave()
             
-            self.rebuild_ui()
-            for stat, value in self.item_stats_data.items():
-                index = self.selected_stats.index(stat)
-                self.item_stats_entries[index].insert(0, value)
-            for stat, value in self.character_stats_data.items():
-                index = self.selected_stats.index(stat)
-                self.character_stats_entries[index].insert(0, value)
+            self.rebuild_ui()  # add_stat_to_ui fills the entries from the session data
             
             self.switch_tab(self.current_tab)
             self.status_label.configure(text="Session loaded")
@@ -1075,7 +1911,9 @@ class App(ctk.CTk):
             "item_index": self.item_index_entry.get(),
             "char_name": self.char_name_entry.get(),
             "char_class": self.char_class_entry.get(),
-            "current_tab": self.current_tab
+            "search_class": self.search_class_entry.get(),
+            "current_tab": self.current_tab,
+            "autosave": bool(self.autosave_checkbox.get())
         }
         try:
             with open(self.session_file, "w", encoding='utf-8') as f:
@@ -1083,8 +1921,39 @@ class App(ctk.CTk):
         except Exception as e:
             print(f"Error saving session: {e}")
 
+    def save_catalogue(self):
+        # Rewrites config.cat from the loaded items on a worker; the next launch opens it.
+        # write_catalogue renames it into place, so a write cut short by exit leaves the
+        # old file, which the next full load finds stale and rewrites again.
+        if self.catalogue_job is not None and self.catalogue_job.running:
+            return
+        source = source_fingerprint(self.storage.source_files())
+        items = dict(self.database["items"])  # records are replaced, never mutated
+        self.catalogue_job = BackgroundJob(
+            self,
+            lambda job: write_catalogue(self.catalogue_file, items, source),
+            on_error=lambda error: print(f"Error saving item catalogue: {error}")
+        ).start()
+
     def destroy(self):
         self.save_session()
+        for job in (self.database_load_job, self.import_job, self.optimizer_job, self.compare_job):
+            if job is not None and job.running:
+                job.cancel()
+        for job in (self.optimizer_job, self.compare_job):
+            if job is not None and job.running:
+                # optimize_gear and compare_all drop their queued chunks once they see the
+                # cancel; exiting before that would leave the process pool working through them.
+                job.wait(1)
+        if self.autosave_after_id is not None:
+            self.after_cancel(self.autosave_after_id)
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        if self.search_job is not None and self.search_job.running:
+            self.search_job.cancel()
+        if self.save_job is not None and self.save_job.running:
+            self.save_job.wait()  # a daemon thread would die mid-write
+        self.storage.close()
         super().destroy()
 
     def _record_action(self, action_type, action_data):
@@ -1122,30 +1991,32 @@ class App(ctk.CTk):
                 item_value = action_data["item_value"]
                 char_value = action_data["char_value"]
                 self.selected_stats.insert(index, stat)
-                self.add_stat_to_ui(stat, index)
+                row = self.add_stat_to_ui(stat, index)
+                row.item_entry.delete(0, "end")
+                row.char_entry.delete(0, "end")
                 if item_value:
-                    self.item_stats_entries[index].insert(0, item_value)
+                    row.item_entry.insert(0, item_value)
                     self.item_stats_data[stat] = item_value
                 if char_value:
-                    self.character_stats_entries[index].insert(0, char_value)
+                    row.char_entry.insert(0, char_value)
                     self.character_stats_data[stat] = char_value
             elif action_type == "update_item":
                 stat = action_data["stat"]
                 previous_value = action_data["previous_value"]
-                index = self.selected_stats.index(stat)
-                self.item_stats_entries[index].delete(0, "end")
+                entry = self.stat_row(stat).item_entry
+                entry.delete(0, "end")
                 if previous_value:
-                    self.item_stats_entries[index].insert(0, previous_value)
+                    entry.insert(0, previous_value)
                     self.item_stats_data[stat] = previous_value
                 else:
                     self.item_stats_data.pop(stat, None)
             elif action_type == "update_character":
                 stat = action_data["stat"]
                 previous_value = action_data["previous_value"]
-                index = self.selected_stats.index(stat)
-                self.character_stats_entries[index].delete(0, "end")
+                entry = self.stat_row(stat).char_entry
+                entry.delete(0, "end")
                 if previous_value:
-                    self.character_stats_entries[index].insert(0, previous_value)
+                    entry.insert(0, previous_value)
                     self.character_stats_data[stat] = previous_value
                 else:
                     self.character_stats_data.pop(stat, None)
@@ -1186,20 +2057,20 @@ class App(ctk.CTk):
             elif action_type == "update_item":
                 stat = action_data["stat"]
                 value = action_data["value"]
-                index = self.selected_stats.index(stat)
-                self.item_stats_entries[index].delete(0, "end")
+                entry = self.stat_row(stat).item_entry
+                entry.delete(0, "end")
                 if value:
-                    self.item_stats_entries[index].insert(0, value)
+                    entry.insert(0, value)
                     self.item_stats_data[stat] = value
                 else:
                     self.item_stats_data.pop(stat, None)
             elif action_type == "update_character":
                 stat = action_data["stat"]
                 value = action_data["value"]
-                index = self.selected_stats.index(stat)
-                self.character_stats_entries[index].delete(0, "end")
+                entry = self.stat_row(stat).char_entry
+                entry.delete(0, "end")
                 if value:
-                    self.character_stats_entries[index].insert(0, value)
+                    entry.insert(0, value)
                     self.character_stats_data[stat] = value
                 else:
                     self.character_stats_data.pop(stat, None)
@@ -0,0 +1,67 @@
+import queue
+import threading
+
+
+class BackgroundJob:
+    # Runs work(job) on a daemon thread. The worker never touches Tk: it posts
+    # progress/results to a queue that the Tk thread drains through widget.after().
+    def __init__(self, widget, work, on_progress=None, on_done=None, on_error=None, poll_ms=50):
+        self.widget = widget
+        self.work = work
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.cancel_event = threading.Event()
+        self._messages = queue.Queue()
+        self._thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.widget.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def wait(self, timeout=None):
+        # Blocks the caller until work returns; its callbacks are not run.
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, *progress):
+        self._messages.put(("progress", progress))
+
+    def _run(self):
+        try:
+            result = self.work(self)
+        except Exception as e:
+            self._messages.put(("error", e))
+        else:
+            self._messages.put(("done", result))
+
+    def _poll(self):
+        finished = False
+        while True:
+            try:
+                kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                if self.on_progress:
+                    self.on_progress(*payload)
+            else:
+                finished = True
+                self.running = False
+                callback = self.on_done if kind == "done" else self.on_error
+                if callback:
+                    callback(payload)
+        if not finished and self.widget.winfo_exists():
+            self.widget.after(self.poll_ms, self._poll)
@@ -0,0 +1,180 @@
+from collections import namedtuple
+
+import numpy as np
+
+from constants import stats, PERCENTAGE_STATS, SPECIAL_STAT_BASES
+from item_catalogue import PARTS
+from stat_parser import compile_stat_value
+
+# Result codes mirroring what StatCalculator.calculate_result returns for a cell.
+RESULT_VALUE = 0    # numeric result (percentage stats are rendered as "<value>%")
+RESULT_BLANK = 1    # ""
+RESULT_NA = 2       # "N/A"
+RESULT_ERROR = 3    # the scalar path raises (non-numeric character value with an item value)
+
+BatchResult = namedtuple("BatchResult", ["values", "codes"])
+
+
+def _parse_character_value(value):
+    try:
+        return float(value.replace('%', '')) if '%' in str(value) else float(value or ""), True
+    except ValueError:
+        return 0.0, False
+
+
+# Scores every item against many characters with a few array operations per stat.
+# Each cell matches StatCalculator(item["stats"], character["stats"], database,
+# char_name=name).calculate_result for that item and character record; non-numeric
+# results are reported through codes.
+#
+# With an ItemCatalogue the item rows are the catalogue's and item columns are
+# scattered straight from its mmap views; database then only needs "characters".
+class BatchEvaluator:
+    def __init__(self, database, item_indices=None, catalogue=None):
+        self.database = database
+        self.catalogue = catalogue
+        if catalogue is not None:
+            self.item_indices = catalogue.item_indices
+        else:
+            self.item_indices = list(database["items"] if item_indices is None else item_indices)
+        self._item_columns = {}
+
+    def _catalogue_columns(self, stat):
+        n = len(self.item_indices)
+        present = np.zeros(n, dtype=bool)
+        columns = {part: np.zeros(n) for part in PARTS}
+        entries = self.catalogue.stat_entries(stat)
+        if entries is not None:
+            rows, entry_present, parts = entries
+            rows = rows[entry_present.view(bool)]
+            present[rows] = True
+            for part, values in parts.items():
+                columns[part][rows] = values[entry_present.view(bool)]
+        # NaN marks a component the parser could not read (ParsedStat None).
+        additive_ok = present & ~np.isnan(columns["base"])
+        flat_ok = present & ~np.isnan(columns["flat_total"])
+        for part in ("base", "bonus", "percentage"):
+            columns[part][~additive_ok] = 0.0
+        columns["flat_total"][~flat_ok] = 0.0
+        return (present[:, None], additive_ok[:, None], columns["base"][:, None], columns["bonus"][:, None],
+                columns["percentage"][:, None], columns["percent_total"][:, None], flat_ok[:, None],
+                columns["flat_total"][:, None])
+
+    def item_columns(self, stat):
+        if stat not in self._item_columns and self.catalogue is not None:
+            self._item_columns[stat] = self._catalogue_columns(stat)
+        if stat not in self._item_columns:
+            n = len(self.item_indices)
+            present = np.zeros(n, dtype=bool)
+            additive_ok = np.zeros(n, dtype=bool)
+            flat_ok = np.zeros(n, dtype=bool)
+            base = np.zeros(n)
+            bonus = np.zeros(n)
+            percentage = np.zeros(n)
+            percent_total = np.zeros(n)
+            flat_total = np.zeros(n)
+            items = self.database["items"]
+            for row, item_index in enumerate(self.item_indices):
+                value = items[item_index].get("stats", {}).get(stat, "")
+                if not value:
+                    continue
+                parsed = compile_stat_value(value)
+                present[row] = True
+                if parsed.base is not None:
+                    additive_ok[row] = True
+                    base[row], bonus[row], percentage[row] = parsed.base, parsed.bonus, parsed.percentage
+                percent_total[row] = parsed.percent_total
+                if parsed.flat_total is not None:
+                    flat_ok[row] = True
+                    flat_total[row] = parsed.flat_total
+            self._item_columns[stat] = (present[:, None], additive_ok[:, None], base[:, None], bonus[:, None],
+                                        percentage[:, None], percent_total[:, None], flat_ok[:, None],
+                                        flat_total[:, None])
+        return self._item_columns[stat]
+
+    def character_columns(self, stat, char_names):
+        characters = self.database["characters"]
+        parsed = [_parse_character_value(characters[name].get("stats", {}).get(stat, "0")) for name in char_names]
+        values = np.array([value for value, _ in parsed], dtype=float).reshape(1, -1)
+        valid = np.array([ok for _, ok in parsed], dtype=bool).reshape(1, -1)
+        return values, valid
+
+    def evaluate(self, char_names=None, stat_names=None):
+        char_names = list(self.database["characters"] if char_names is None else char_names)
+        if stat_names is None:
+            stat_names = [listbox_stat for listbox_stat, _, _ in stats]
+
+        results = {}
+        for stat in stat_names:
+            self._evaluate_stat(stat, char_names, results)
+        return {stat: results[stat] for stat in stat_names}
+
+    def _evaluate_stat(self, stat, char_names, results):
+        if stat in results:
+            return results[stat]
+        if stat in SPECIAL_STAT_BASES:
+            self._evaluate_stat(SPECIAL_STAT_BASES[stat], char_names, results)
+
+        present, additive_ok, base, bonus, percentage, percent_total, flat_ok, flat_total = self.item_columns(stat)
+        char_value, char_valid = self.character_columns(stat, char_names)
+        shape = (len(self.item_indices), len(char_names))
+        values = np.zeros(shape)
+        codes = np.full(shape, RESULT_BLANK, dtype=np.int8)
+
+        missing = ~present & char_valid
+        if stat not in PERCENTAGE_STATS:
+            np.copyto(values, np.trunc(char_value), where=missing)
+            np.copyto(codes, RESULT_VALUE, where=missing)
+
+        # `int(char_value) if char_value else "N/A"` when the item value cannot be parsed
+        truthy = char_valid & (char_value != 0)
+        fallback_value = np.trunc(char_value)
+
+        def fallback(where):
+            np.copyto(values, fallback_value, where=where & truthy)
+            np.copyto(codes, np.where(truthy, RESULT_VALUE, RESULT_NA).astype(np.int8), where=where)
+
+        if stat in PERCENTAGE_STATS:
+            np.copyto(values, np.where(char_valid, char_value, 0.0) + percent_total, where=present)
+            np.copyto(codes, RESULT_VALUE, where=present)
+        elif stat in SPECIAL_STAT_BASES:
+            base_result = results[SPECIAL_STAT_BASES[stat]]
+            base_ok = present & flat_ok & (base_result.codes == RESULT_VALUE)
+            base_error = present & flat_ok & (base_result.codes == RESULT_ERROR)
+            with np.errstate(all="ignore"):
+                total = (base_result.values / 250) * flat_total + flat_total
+            np.copyto(values, np.trunc(total), where=base_ok)
+            np.copyto(codes, RESULT_VALUE, where=base_ok)
+            np.copyto(codes, RESULT_ERROR, where=base_error)
+            fallback(present & ~base_ok & ~base_error)
+        else:
+            with np.errstate(all="ignore"):
+                total_base = (char_value + base) + bonus
+                total = np.trunc(total_base + total_base * percentage)
+            computed = present & additive_ok & char_valid
+            np.copyto(values, total, where=computed)
+            np.copyto(codes, RESULT_VALUE, where=computed)
+            np.copyto(codes, RESULT_ERROR, where=present & additive_ok & ~char_valid)
+            fallback(present & ~additive_ok)
+
+        results[stat] = BatchResult(values, codes)
+        return results[stat]
+
+    def rank_items(self, stat, char_name, k=None):
+        result = self.evaluate([char_name], [stat])[stat]
+        values = result.values[:, 0]
+        rows = np.flatnonzero(result.codes[:, 0] == RESULT_VALUE)
+        order = rows[np.argsort(-values[rows], kind="stable")]
+        if k is not None:
+            order = order[:k]
+        return [(self.item_indices[row], float(values[row])) for row in order]
+
+
+def to_scalar(stat, value, code):
+    if code == RESULT_BLANK:
+        return ""
+    if code == RESULT_NA:
+        return "N/A"
+    if code == RESULT_ERROR:
+        return None
+    return f"{value}%" if stat in PERCENTAGE_STATS else int(value)
@@ -0,0 +1,179 @@
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+
+from constants import character_classes
+from stat_parser import item_stat_number
+from stat_registry import STAT_REGISTRY
+from storage import default_database_path, open_storage
+
+IMPORT_BATCH_SIZE = 1000
+
+# Columns/keys that are not stats. A row is an item when it has item_index and a
+# character when it has name (or says so in kind); every other column is a stat.
+RESERVED_COLUMNS = {"kind", "item_index", "name", "class", "slot", "stats"}
+
+ImportResult = namedtuple("ImportResult", ["items", "characters", "rejected", "cancelled"])
+
+
+def normalize_stat(name):
+    # Combined label, CN or EN name (EN case-insensitive) -> combined label; None if unknown
+    return STAT_REGISTRY.canonical(name.strip())
+
+
+def normalize_value(kind, stat, value):
+    value = str(value).strip()
+    if not value:
+        return None
+    if kind == "items":
+        # Pre-parse with the calculator's parser so unusable values never reach the database.
+        if item_stat_number(stat, value) is None:
+            raise ValueError(f"Invalid value '{value}' for {stat}")
+    else:
+        try:
+            float(value.replace('%', ''))
+        except ValueError:
+            raise ValueError(f"Invalid value '{value}' for {stat}")
+    # Same storage form as save_database: digit-only values become ints.
+    return int(value) if value.isdigit() else value
+
+
+def parse_row(row):
+    # (kind, key, record) for one input row; ValueError with the reason if rejected.
+    if not isinstance(row, dict):
+        raise ValueError("Not a JSON object")
+    if None in row:
+        raise ValueError("More fields than header columns")
+    kind = str(row.get("kind") or "").strip().lower()
+    if kind in ("item", "items") or (not kind and row.get("item_index")):
+        kind, key = "items", str(row.get("item_index") or "").strip()
+    elif kind in ("character", "characters") or (not kind and row.get("name")):
+        kind, key = "characters", str(row.get("name") or "").strip()
+    else:
+        raise ValueError("Missing item_index or name")
+    if not key:
+        raise ValueError("Empty item_index or name")
+
+    item_class = str(row.get("class") or "All").strip()
+    if item_class not in character_classes:
+        raise ValueError(f"Unknown class '{item_class}'")
+
+    raw_stats = dict(row["stats"]) if isinstance(row.get("stats"), dict) else {}
+    raw_stats.update((column, value) for column, value in row.items() if column not in RESERVED_COLUMNS)
+    record_stats = {}
+    for column, value in raw_stats.items():
+        if value is None or not str(value).strip():
+            continue
+        stat = normalize_stat(column)
+        if stat is None:
+            raise ValueError(f"Unknown stat '{column}'")
+        record_stats[stat] = normalize_value(kind, stat, value)
+    if not record_stats:
+        raise ValueError("No stats")
+
+    record = {"class": item_class, "stats": record_stats}
+    if kind == "items" and row.get("slot"):
+        record["slot"] = str(row["slot"]).strip()
+    return kind, key, record
+
+
+def read_rows(path):
+    # Streams (line number, row, bytes read) from a .csv or JSON-lines file. Rows
+    # that are not valid JSON come through as None so they can be reported.
+    progress = [0]
+
+    def lines(f):
+        for raw in f:
+            progress[0] += len(raw)
+            yield raw.decode("utf-8-sig")
+
+    with open(path, "rb") as f:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            reader = csv.DictReader(lines(f))
+            for row in reader:
+                yield reader.line_num, row, progress[0]
+        else:
+            for line_number, line in enumerate(lines(f), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_number, row, progress[0]
+
+
+def import_file(path, storage, rejects_path=None, batch_size=IMPORT_BATCH_SIZE, on_progress=None, cancelled=None):
+    # Memory stays bounded by batch_size on backends with partial_writes; plain
+    # JSON storage can only rewrite the whole file, so it is merged and saved once.
+    total_bytes = os.path.getsize(path) or 1
+    database = None if storage.partial_writes else storage.load()
+    batch = {"items": {}, "characters": {}}
+    written = {"items": 0, "characters": 0}
+    rows = rejected = 0
+    rejects = None
+    if rejects_path is not None and os.path.exists(rejects_path):
+        os.remove(rejects_path)  # left over from an earlier import
+
+    def flush():
+        if database is None:
+            storage.write_records(batch["items"], batch["characters"])
+        else:
+            database["items"].update(batch["items"])
+            database["characters"].update(batch["characters"])
+        for kind in batch:
+            written[kind] += len(batch[kind])
+            batch[kind].clear()
+
+    try:
+        for line_number, row, bytes_read in read_rows(path):
+            if cancelled is not None and cancelled():
+                return ImportResult(written["items"], written["characters"], rejected, True)
+            rows += 1
+            try:
+                kind, key, record = parse_row(row)
+            except ValueError as e:
+                rejected += 1
+                if rejects_path is not None:
+                    if rejects is None:
+                        rejects = open(rejects_path, "w", encoding='utf-8')
+                    rejects.write(json.dumps({"line": line_number, "reason": str(e), "row": row}, ensure_ascii=False) + "\n")
+                continue
+            batch[kind][key] = record
+            if len(batch["items"]) + len(batch["characters"]) >= batch_size:
+                flush()
+                if on_progress:
+                    on_progress(rows, bytes_read / total_bytes)
+        flush()
+        if database is not None:
+            storage.save_all(database)
+        if on_progress:
+            on_progress(rows, 1.0)
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return ImportResult(written["items"], written["characters"], rejected, False)
+
+
+def rejects_path_for(path):
+    return path + ".rejected.jsonl"
+
+
+if __name__ == "__main__":
+    # python bulk_import.py dump.csv [config.json|config.db]
+    if len(sys.argv) < 2:
+        print("Usage: python bulk_import.py <dump.csv|dump.jsonl> [database file]")
+        sys.exit(1)
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else default_database_path()
+    storage = open_storage(target)
+    try:
+        result = import_file(source, storage, rejects_path_for(source),
+                             on_progress=lambda rows, fraction: print(f"\r{rows} rows read ({fraction:.0%})", end="", flush=True))
+    finally:
+        storage.close()
+    print(f"\nImported {result.items} items and {result.characters} characters into {target}")
+    if result.rejected:
+        print(f"Rejected {result.rejected} rows, see {rejects_path_for(source)}")
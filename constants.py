@@ -53,4 +53,36 @@ character_classes = [
     "Priest (F): Mistress",
     "Priest (F): Miko",
     "Priest (F): Infighter"
-]
\ No newline at end of file
+]
+
+PERCENTAGE_STATS = {
+    "攻击速度 (Attack Speed)",
+    "施法速度 (Casting Speed)",
+    "移动速度 (Movement Speed)"
+}
+ADDITIVE_STATS = {
+    "生命值 (HP)",
+    "魔法值 (MP)",
+    "力量 (Strength)",
+    "智力 (Intelligence)",
+    "体力 (Physical Strength)",
+    "精神 (Spirit)",
+    "火属性强化 (Fire Enhance)",
+    "冰属性强化 (Ice Enhance)",
+    "光属性强化 (Light Enhance)",
+    "暗属性强化 (Dark Enhance)",
+    "火属性抗性 (Fire Resistance)",
+    "冰属性抗性 (Ice Resistance)",
+    "光属性抗性 (Light Resistance)",
+    "暗属性抗性 (Dark Resistance)"
+}
+SPECIAL_STATS = {
+    "物理攻击力 (Physical Attack Power)",
+    "魔法攻击力 (Magical Attack Power)"
+}
+
+# Special stats scale with a base stat: (base / 250) * item + item
+SPECIAL_STAT_BASES = {
+    "物理攻击力 (Physical Attack Power)": "力量 (Strength)",
+    "魔法攻击力 (Magical Attack Power)": "智力 (Intelligence)"
+}
\ No newline at end of file
@@ -0,0 +1,227 @@
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from constants import PERCENTAGE_STATS, SPECIAL_STAT_BASES
+from records import BASE, BONUS, CLASS_REGISTRY, FLAT_TOTAL, PERCENT_TOTAL, PERCENTAGE, Character, ItemRecords
+from stat_registry import STAT_REGISTRY
+
+PHYSICAL_DAMAGE = "Expected Physical Damage"
+MAGICAL_DAMAGE = "Expected Magical Damage"
+
+# Expected damage = attack * (1 + crit_rate * (crit_multiplier - 1)), with the crit
+# multiplier from StatCalculator.calculate_critical_damage: 1.5 + critical damage / 100.
+DAMAGE_OBJECTIVES = {
+    PHYSICAL_DAMAGE: ("物理攻击力 (Physical Attack Power)", "Physical Critical Hit Rate", "Critical Damage"),
+    MAGICAL_DAMAGE: ("魔法攻击力 (Magical Attack Power)", "Magical Critical Hit Rate", "Critical Damage"),
+}
+
+# Everything a worker process needs, kept picklable.
+#   components    -> ((stat, kind), ...) positions of each item vector
+#   slots         -> ((slot, ((item_index, vector), ...)), ...)
+#   base_values   -> {stat: character value}
+OptimizerProblem = namedtuple("OptimizerProblem", ["objective", "components", "slots", "base_values"])
+OptimizerResult = namedtuple("OptimizerResult", ["value", "items", "nodes", "cancelled"])
+
+
+def objective_stats(objective):
+    stats = []
+    pending = list(DAMAGE_OBJECTIVES.get(objective, (objective,)))
+    while pending:
+        stat = pending.pop(0)
+        if stat not in stats:
+            stats.append(stat)
+            if stat in SPECIAL_STAT_BASES:
+                pending.append(SPECIAL_STAT_BASES[stat])
+    return stats
+
+
+def _components(stat):
+    if stat in PERCENTAGE_STATS:
+        return [(stat, "percent")]
+    if stat in SPECIAL_STAT_BASES:
+        return [(stat, "flat_total"), (stat, "count")]
+    return [(stat, "flat"), (stat, "pct")]
+
+
+def _item_vector(record, stat_kinds):
+    # Read in place from the record's component array (NaN where the parser gave None);
+    # nothing is reparsed. stat_kinds: ((stat id, (kind, ...)), ...) in components order.
+    parts = record.components
+    vector = []
+    for stat_id, kinds in stat_kinds:
+        start = record.offset(stat_id)
+        if start is None:
+            vector.extend([0.0] * len(kinds))
+            continue
+        for kind in kinds:
+            if kind == "percent":
+                value = parts[start + PERCENT_TOTAL]
+            elif kind == "flat_total":
+                value = parts[start + FLAT_TOTAL]
+            elif kind == "count":
+                value = 0.0 if math.isnan(parts[start + FLAT_TOTAL]) else 1.0
+            elif kind == "flat":
+                value = parts[start + BASE] + parts[start + BONUS]
+            else:
+                value = parts[start + PERCENTAGE]
+            vector.append(0.0 if math.isnan(value) else value)
+    return tuple(vector)
+
+
+def build_problem(database, char_name, objective, item_records=None):
+    # item_records: an ItemRecords kept by the caller, so later runs reuse the parsed items.
+    character = Character.from_dict(char_name, database["characters"].get(char_name, {}))
+    any_class = CLASS_REGISTRY.register("All")
+    stats = objective_stats(objective)
+    components = tuple(component for stat in stats for component in _components(stat))
+    stat_kinds = [(STAT_REGISTRY.register(stat), tuple(kind for _, kind in _components(stat))) for stat in stats]
+
+    slots = {}
+    if item_records is None:
+        item_records = ItemRecords()
+    for record in item_records.update(database["items"]):
+        if character.class_id != any_class and record.class_id not in (any_class, character.class_id):
+            continue
+        vector = _item_vector(record, stat_kinds)
+        if any(vector):
+            slots.setdefault(record.slot, []).append((record.item_index, vector))
+
+    base_values = {stat: character.value(stat) or 0.0 for stat in stats}
+    problem = OptimizerProblem(objective, components, (), base_values)
+    # Best standalone items first so the search finds a strong incumbent early.
+    ordered_slots = []
+    for slot, options in slots.items():
+        options.sort(key=lambda option: evaluate(problem, option[1]), reverse=True)
+        ordered_slots.append((slot, tuple(options)))
+    # The largest slot goes first: its options are what gets split across workers.
+    ordered_slots.sort(key=lambda slot: len(slot[1]), reverse=True)
+    return problem._replace(slots=tuple(ordered_slots))
+
+
+def evaluate(problem, totals, optimistic=False):
+    values = dict(zip(problem.components, totals))
+
+    def stat_value(stat):
+        base = problem.base_values.get(stat, 0.0)
+        if stat in PERCENTAGE_STATS:
+            return base + values[(stat, "percent")]
+        if stat in SPECIAL_STAT_BASES:
+            # Same formula as StatCalculator.calculate_special_stat; with no item
+            # carrying the stat the character's own value is used as is.
+            flat = values[(stat, "flat_total")]
+            if optimistic:
+                flat = max(flat, base)
+            elif values[(stat, "count")] == 0:
+                return int(base)
+            return int((stat_value(SPECIAL_STAT_BASES[stat]) / 250) * flat + flat)
+        total = base + values[(stat, "flat")]
+        return int(total + total * values[(stat, "pct")])
+
+    if problem.objective in DAMAGE_OBJECTIVES:
+        attack_stat, rate_stat, bonus_stat = DAMAGE_OBJECTIVES[problem.objective]
+        rate = min(max(stat_value(rate_stat) / 100, 0.0), 1.0)
+        multiplier = 1.5 + stat_value(bonus_stat) / 100
+        return stat_value(attack_stat) * (1 + rate * (multiplier - 1))
+    return stat_value(problem.objective)
+
+
+def _add(totals, vector):
+    return tuple(a + b for a, b in zip(totals, vector))
+
+
+def _optimistic_suffixes(problem):
+    # suffix[i]: per-component best gain still available from slots i.., assuming
+    # the objective never decreases when a component grows (non-negative stats).
+    width = len(problem.components)
+    suffixes = [tuple([0.0] * width)]
+    for _, options in reversed(problem.slots):
+        best = [max([0.0] + [vector[i] for _, vector in options]) for i in range(width)]
+        suffixes.append(_add(suffixes[-1], best))
+    suffixes.reverse()
+    return suffixes
+
+
+def solve_branch(problem, first_choices, incumbent=float("-inf")):
+    # Branch-and-bound over slots 1.. for each choice of slot 0 (None = leave empty).
+    # incumbent is a value already known to be reachable; items stays None unless
+    # this branch finds something strictly better.
+    suffixes = _optimistic_suffixes(problem)
+    best = [incumbent, None]
+    nodes = 0
+    empty = tuple([0.0] * len(problem.components))
+
+    def search(slot, totals, chosen):
+        nonlocal nodes
+        nodes += 1
+        if slot == len(problem.slots):
+            value = evaluate(problem, totals)
+            if value > best[0]:
+                best[0], best[1] = value, list(chosen)
+            return
+        if evaluate(problem, _add(totals, suffixes[slot]), optimistic=True) <= best[0]:
+            return
+        slot_name, options = problem.slots[slot]
+        for item_index, vector in options:
+            chosen.append((slot_name, item_index))
+            search(slot + 1, _add(totals, vector), chosen)
+            chosen.pop()
+        search(slot + 1, totals, chosen)
+
+    if not problem.slots:
+        return OptimizerResult(evaluate(problem, empty), [], 1, False)
+
+    slot_name, options = problem.slots[0]
+    vectors = dict(options)
+    for item_index in first_choices:
+        if item_index is None:
+            search(1, empty, [])
+        else:
+            search(1, vectors[item_index], [(slot_name, item_index)])
+    return OptimizerResult(best[0], best[1], nodes, False)
+
+
+def optimize_gear(database, char_name, objective, job=None, max_workers=None, chunks_per_worker=4, item_records=None):
+    problem = build_problem(database, char_name, objective, item_records)
+    if not problem.slots:
+        return solve_branch(problem, [])
+
+    # Greedy incumbent (best standalone item per slot) gives every worker a pruning bound.
+    greedy = tuple([0.0] * len(problem.components))
+    for _, options in problem.slots:
+        greedy = _add(greedy, options[0][1])
+    incumbent = evaluate(problem, greedy)
+
+    first_choices = [item_index for item_index, _ in problem.slots[0][1]] + [None]
+    max_workers = max_workers or os.cpu_count() or 1
+    size = max(1, len(first_choices) // (max_workers * chunks_per_worker))
+    chunks = [first_choices[i:i + size] for i in range(0, len(first_choices), size)]
+
+    best = OptimizerResult(float("-inf"), None, 0, False)
+    nodes = 0
+    done = 0
+    cancelled = False
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(solve_branch, problem, chunk, incumbent) for chunk in chunks}
+        while pending:
+            if job is not None and job.cancelled:
+                cancelled = True
+                break
+            finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                nodes += result.nodes
+                if result.items is not None and result.value > best.value:
+                    best = result
+                done += 1
+                if job is not None:
+                    job.report(done, len(chunks))
+    finally:
+        executor.shutdown(wait=not cancelled, cancel_futures=True)
+
+    if best.items is None and not cancelled:
+        # No branch beat the greedy incumbent, so the greedy pick is optimal.
+        best = OptimizerResult(incumbent, [(slot, options[0][0]) for slot, options in problem.slots], 0, False)
+    return best._replace(nodes=nodes, cancelled=cancelled)
@@ -0,0 +1,282 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from stat_parser import compile_stat_value, item_stat_number
+
+# Binary, read-only snapshot of database["items"] laid out as fixed-width columns.
+#   MAGIC | uint64 header length | JSON header | padding | columns (8-byte aligned)
+# The header lists the interned stat and class names (their position is the id) and
+# where each column lives relative to the data start. Opening only reads the header;
+# every column is a numpy view over the shared mmap, so nothing is parsed or copied.
+# Raw values are not stored: the catalogue answers which rows match, and the records
+# themselves still come from database["items"].
+#
+#   item_class      int32[items]          class id per row
+#   name_offsets    int64[items + 1]      item index strings, utf-8 in name_bytes
+#   class_offsets   int64[classes + 1]    class_rows grouped by class id, rows ascending
+#   stat_offsets    int64[stats + 1]      entry_* grouped by stat id, rows ascending
+#   entry_rows      int32[entries]
+#   entry_present   uint8[entries]        1 when the raw value is non-empty
+#   entry_<part>    float64[entries]      ParsedStat fields, NaN where None
+#   number_offsets  int64[stats + 1]      item_stat_number sorted per stat (range filters)
+#   number_values   float64, number_rows int32
+MAGIC = b"STATCAT1"
+FORMAT_VERSION = 1
+PARTS = ("base", "bonus", "percentage", "percent_total", "flat_total")
+
+_HEADER_PREFIX = struct.Struct("<8sQ")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def source_fingerprint(paths):
+    # Name, size and mtime of the files the items were loaded from; missing and
+    # empty files are skipped, an empty journal holds no records.
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size:
+            fingerprint.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def _build_columns(items):
+    stat_ids = {}
+    class_ids = {}
+    item_class = []
+    names = []
+    entries = {}  # stat id -> [(row, present, parts, number)]
+    for row, (item_index, item_data) in enumerate(items.items()):
+        names.append(item_index.encode("utf-8"))
+        item_class.append(class_ids.setdefault(item_data.get("class", "All"), len(class_ids)))
+        for stat, value in item_data.get("stats", {}).items():
+            stat_id = stat_ids.setdefault(stat, len(stat_ids))
+            parsed = compile_stat_value(value) if value else None
+            parts = [np.nan if parsed is None or getattr(parsed, part) is None else getattr(parsed, part)
+                     for part in PARTS]
+            number = item_stat_number(stat, value)
+            entries.setdefault(stat_id, []).append((row, bool(value), parts, number))
+
+    item_class = np.array(item_class, dtype=np.int32)
+    name_offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in names], out=name_offsets[1:])
+    class_rows = np.argsort(item_class, kind="stable").astype(np.int32)
+    class_offsets = np.zeros(len(class_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(item_class, minlength=len(class_ids)), out=class_offsets[1:])
+
+    stat_offsets = [0]
+    number_offsets = [0]
+    rows, present, parts, number_values, number_rows = [], [], [], [], []
+    for stat_id in range(len(stat_ids)):
+        stat_entries = entries[stat_id]
+        for row, is_present, entry_parts, _ in stat_entries:
+            rows.append(row)
+            present.append(is_present)
+            parts.append(entry_parts)
+        numbered = sorted((number, row) for row, _, _, number in stat_entries if number is not None)
+        number_values.extend(number for number, _ in numbered)
+        number_rows.extend(row for _, row in numbered)
+        stat_offsets.append(len(rows))
+        number_offsets.append(len(number_rows))
+
+    parts = np.array(parts, dtype=np.float64).reshape(-1, len(PARTS))
+    columns = {
+        "item_class": item_class,
+        "name_offsets": name_offsets,
+        "name_bytes": np.frombuffer(b"".join(names), dtype=np.uint8),
+        "class_offsets": class_offsets,
+        "class_rows": class_rows,
+        "stat_offsets": np.array(stat_offsets, dtype=np.int64),
+        "entry_rows": np.array(rows, dtype=np.int32),
+        "entry_present": np.array(present, dtype=np.uint8),
+        "number_offsets": np.array(number_offsets, dtype=np.int64),
+        "number_values": np.array(number_values, dtype=np.float64),
+        "number_rows": np.array(number_rows, dtype=np.int32),
+    }
+    for i, part in enumerate(PARTS):
+        columns["entry_" + part] = np.ascontiguousarray(parts[:, i])
+    return list(stat_ids), list(class_ids), columns
+
+
+def write_catalogue(path, items, source=None):
+    stat_names, class_names, columns = _build_columns(items)
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        layout[name] = [array.dtype.str, offset, len(array)]
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "items": len(items),
+        "stats": stat_names,
+        "classes": class_names,
+        "source": source,
+        "columns": layout,
+    }, ensure_ascii=False).encode("utf-8")
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        data_start = f.tell()
+        for name, array in columns.items():
+            f.write(b"\0" * (data_start + layout[name][1] - f.tell()))
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class ItemIndices:
+    # Lazy sequence over the item index string table; strings are decoded on access.
+    def __init__(self, catalogue):
+        self._catalogue = catalogue
+
+    def __len__(self):
+        return self._catalogue.item_count
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self._catalogue.item_index(row)
+
+    def __iter__(self):
+        return (self._catalogue.item_index(row) for row in range(len(self)))
+
+
+class ItemCatalogue:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _HEADER_PREFIX.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not an item catalogue")
+        self.header = json.loads(self._mmap[_HEADER_PREFIX.size:_HEADER_PREFIX.size + header_length])
+        if self.header["format"] != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"Unsupported item catalogue format {self.header['format']}")
+        data_start = _align(_HEADER_PREFIX.size + header_length)
+
+        self.item_count = self.header["items"]
+        self.stat_ids = {stat: i for i, stat in enumerate(self.header["stats"])}
+        self.class_ids = {item_class: i for i, item_class in enumerate(self.header["classes"])}
+        self.source = self.header["source"]
+        self.columns = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=count, offset=data_start + offset)
+            for name, (dtype, offset, count) in self.header["columns"].items()
+        }
+        self.item_indices = ItemIndices(self)
+
+    def item_index(self, row):
+        start, end = self.columns["name_offsets"][row:row + 2]
+        return self.columns["name_bytes"][start:end].tobytes().decode("utf-8")
+
+    def _segment(self, offsets, key_id, *names):
+        start, end = self.columns[offsets][key_id:key_id + 2]
+        return [self.columns[name][start:end] for name in names]
+
+    def stat_entries(self, stat):
+        # (rows, present, {part: values}) for one stat; views, not copies. None if no item has it.
+        stat_id = self.stat_ids.get(stat)
+        if stat_id is None:
+            return None
+        rows, present, *parts = self._segment("stat_offsets", stat_id, "entry_rows", "entry_present",
+                                              *("entry_" + part for part in PARTS))
+        return rows, present, dict(zip(PARTS, parts))
+
+    def class_rows(self, item_class):
+        class_id = self.class_ids.get(item_class)
+        if class_id is None:
+            return self.columns["class_rows"][:0]
+        return self._segment("class_offsets", class_id, "class_rows")[0]
+
+    def range_rows(self, stat, minimum=None, maximum=None):
+        stat_id = self.stat_ids.get(stat)
+        if stat_id is None:
+            return self.columns["number_rows"][:0]
+        values, rows = self._segment("number_offsets", stat_id, "number_values", "number_rows")
+        low = 0 if minimum is None else np.searchsorted(values, minimum, side="left")
+        high = len(values) if maximum is None else np.searchsorted(values, maximum, side="right")
+        return np.sort(rows[low:high])
+
+    def search_rows(self, selected_stats, selected_class, ranges=None):
+        # Same rules as ItemSearchIndex.search, as ascending row numbers (database order).
+        candidates = []
+        if selected_class != "All":
+            candidates.append(np.union1d(self.class_rows(selected_class), self.class_rows("All")))
+        for stat in set(selected_stats):
+            stat_id = self.stat_ids.get(stat)
+            if stat_id is None:
+                return np.zeros(0, dtype=np.int32)
+            candidates.append(self._segment("stat_offsets", stat_id, "entry_rows")[0])
+        candidates.extend(self.range_rows(stat, minimum, maximum)
+                          for stat, (minimum, maximum) in (ranges or {}).items())
+        if not candidates:
+            return np.arange(self.item_count, dtype=np.int32)
+
+        candidates.sort(key=len)
+        matched = candidates[0]
+        for candidate in candidates[1:]:
+            if not len(matched):
+                break
+            matched = matched[np.isin(matched, candidate, assume_unique=True)]
+        return matched
+
+    def search(self, selected_stats, selected_class, ranges=None):
+        return [self.item_index(row) for row in self.search_rows(selected_stats, selected_class, ranges)]
+
+    def close(self):
+        self.columns = {}
+        self.item_indices = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # a caller still holds a column view; the map goes away with it
+
+
+def open_catalogue(path, source=None):
+    # The catalogue at path, or None when it is missing, unreadable or was
+    # written from different source files than `source`.
+    if not os.path.exists(path):
+        return None
+    try:
+        catalogue = ItemCatalogue(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error opening item catalogue: {e}")
+        return None
+    if source is not None and catalogue.source != source:
+        catalogue.close()
+        return None
+    return catalogue
+
+
+if __name__ == "__main__":
+    # python item_catalogue.py config.json config.cat
+    from storage import open_storage
+
+    source_path = sys.argv[1] if len(sys.argv) > 1 else "config.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "config.cat"
+    storage = open_storage(source_path)
+    try:
+        items = storage.load()["items"]
+    finally:
+        storage.close()
+    write_catalogue(target, items, source_fingerprint(storage.source_files()))
+    print(f"Wrote {len(items)} items from {source_path} to {target}")
@@ -0,0 +1,37 @@
+GRAM_SIZE = 3
+
+
+class LabelIndex:
+    # Substring lookup over short labels in several languages. Each entry is a tuple of
+    # names (e.g. the combined label, CN and EN of a stat); an entry matches when the
+    # text is in any of them, case-insensitively. Every 1..GRAM_SIZE character slice of
+    # every name is indexed, so texts up to GRAM_SIZE long (prefixes being typed) are a
+    # single lookup and longer ones only check the entries holding all their trigrams.
+    def __init__(self, entries):
+        self.keys = [tuple({name.casefold() for name in names if name}) for names in entries]
+        self.all = frozenset(range(len(self.keys)))
+        self._grams = {}
+        for entry_id, keys in enumerate(self.keys):
+            for key in keys:
+                for size in range(1, GRAM_SIZE + 1):
+                    for start in range(len(key) - size + 1):
+                        self._grams.setdefault(key[start:start + size], set()).add(entry_id)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def match(self, text):
+        # Set of entry ids (positions in entries) matching text; all of them for ""
+        text = text.strip().casefold()
+        if not text:
+            return self.all
+        if len(text) <= GRAM_SIZE:
+            return self._grams.get(text, frozenset())
+        candidates = None
+        for start in range(len(text) - GRAM_SIZE + 1):
+            entry_ids = self._grams.get(text[start:start + GRAM_SIZE])
+            if not entry_ids:
+                return frozenset()
+            candidates = set(entry_ids) if candidates is None else candidates & entry_ids
+        return {entry_id for entry_id in candidates
+                if any(text in key for key in self.keys[entry_id])}
@@ -1,5 +1,9 @@
+import multiprocessing
+
 from app import App
 
 if __name__ == "__main__":
+    # Needed for the optimizer's process pool in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     app = App()
     app.mainloop()
\ No newline at end of file
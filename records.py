@@ -0,0 +1,232 @@
+import math
+import sys
+import threading
+from array import array
+
+from constants import character_classes, PERCENTAGE_STATS, SPECIAL_STATS
+from stat_parser import ParsedStat, compile_stat_value
+from stat_registry import STAT_REGISTRY
+
+# Compact in-memory forms of the database records. Stats are stored by registry id
+# in parallel arrays: each item stat takes len(ParsedStat._fields) float64 slots of
+# its parsed components (NaN where the parser gave None), so numbers are read
+# without reparsing. The raw values are kept only to display and to write back.
+COMPONENT_COUNT = len(ParsedStat._fields)
+BASE, BONUS, PERCENTAGE, PERCENT_TOTAL, FLAT_TOTAL = range(COMPONENT_COUNT)  # offsets within a stat
+DEFAULT_SLOT = "Any"
+_NAN = float("nan")
+_EMPTY = (_NAN,) * COMPONENT_COUNT
+
+
+class ClassRegistry:
+    # Class ids: positions in constants.character_classes, unknown classes appended.
+    def __init__(self, class_names):
+        self.names = [sys.intern(name) for name in class_names]
+        self._ids = {name: class_id for class_id, name in enumerate(self.names)}
+        self._lock = threading.Lock()
+
+    def register(self, name):
+        class_id = self._ids.get(name)
+        if class_id is None:
+            with self._lock:  # records are built on worker threads
+                class_id = self._ids.get(name)
+                if class_id is None:
+                    class_id = len(self.names)
+                    self.names.append(sys.intern(name))
+                    self._ids[name] = class_id
+        return class_id
+
+    def name(self, class_id):
+        return self.names[class_id]
+
+
+CLASS_REGISTRY = ClassRegistry(character_classes)
+
+
+def _component(value):
+    return None if math.isnan(value) else value
+
+
+class Item:
+    __slots__ = ("item_index", "class_id", "stat_ids", "components", "raw", "extra")
+
+    def __init__(self, item_index, class_id, stat_ids, components, raw, extra=None):
+        self.item_index = item_index
+        self.class_id = class_id
+        self.stat_ids = stat_ids        # array('H') of registry ids
+        self.components = components    # array('d'), COMPONENT_COUNT per stat
+        self.raw = raw                  # raw values in stat_ids order
+        self.extra = extra              # other record fields (e.g. "slot"), or None
+
+    @classmethod
+    def from_dict(cls, item_index, item_data):
+        item_stats = item_data.get("stats", {})
+        components = array("d")
+        for value in item_stats.values():
+            parsed = compile_stat_value(value) if value else None
+            components.extend(_EMPTY if parsed is None else
+                              (_NAN if part is None else part for part in parsed))
+        extra = {key: value for key, value in item_data.items() if key not in ("class", "stats")}
+        return cls(item_index,
+                   CLASS_REGISTRY.register(item_data.get("class", "All")),
+                   array("H", (STAT_REGISTRY.register(stat) for stat in item_stats)),
+                   components,
+                   tuple(item_stats.values()),
+                   extra or None)
+
+    def to_dict(self):
+        item_data = {"class": self.item_class, "stats": dict(zip(self.stats(), self.raw))}
+        if self.extra:
+            item_data.update(self.extra)
+        return item_data
+
+    @property
+    def item_class(self):
+        return CLASS_REGISTRY.name(self.class_id)
+
+    @property
+    def slot(self):
+        return (self.extra or {}).get("slot", DEFAULT_SLOT)
+
+    def stats(self):
+        return [STAT_REGISTRY.label(stat_id) for stat_id in self.stat_ids]
+
+    def __getstate__(self):
+        # Ids are only meaningful within one process: pickle labels and class name.
+        return (self.item_index, self.item_class, tuple(self.stats()), self.components, self.raw, self.extra)
+
+    def __setstate__(self, state):
+        item_index, item_class, item_stats, self.components, self.raw, self.extra = state
+        self.item_index = item_index
+        self.class_id = CLASS_REGISTRY.register(item_class)
+        self.stat_ids = array("H", (STAT_REGISTRY.register(stat) for stat in item_stats))
+
+    def _position(self, stat):
+        stat_id = STAT_REGISTRY.label_id(stat)
+        if stat_id is None or stat_id not in self.stat_ids:
+            return None
+        return self.stat_ids.index(stat_id)
+
+    def offset(self, stat_id):
+        # Start of the stat's components in self.components, None when the item lacks it
+        try:
+            return self.stat_ids.index(stat_id) * COMPONENT_COUNT
+        except ValueError:
+            return None
+
+    def raw_value(self, stat):
+        position = self._position(stat)
+        return "" if position is None else self.raw[position]
+
+    def parsed(self, stat):
+        # ParsedStat of the stat's value; None when the item has no value for it.
+        return self._parsed_at(self._position(stat))
+
+    def _parsed_at(self, position):
+        if position is None or not self.raw[position]:
+            return None
+        start = position * COMPONENT_COUNT
+        return ParsedStat(*map(_component, self.components[start:start + COMPONENT_COUNT]))
+
+    def numbers(self):
+        # {stat: number} for every stat with a usable value, as stat_parser.item_stat_number
+        numbers = {}
+        for position, stat_id in enumerate(self.stat_ids):
+            stat = STAT_REGISTRY.label(stat_id)
+            number = self._number(stat, self._parsed_at(position))
+            if number is not None:
+                numbers[stat] = number
+        return numbers
+
+    def stat_number(self, stat):
+        return self._number(stat, self.parsed(stat))
+
+    @staticmethod
+    def _number(stat, parsed):
+        if parsed is None:
+            return None
+        if stat in PERCENTAGE_STATS:
+            return parsed.percent_total
+        if stat in SPECIAL_STATS:
+            return parsed.flat_total
+        if parsed.base is None:
+            return None
+        return parsed.base + parsed.bonus
+
+
+def _character_number(value):
+    try:
+        return float(str(value).replace('%', ''))
+    except ValueError:
+        return _NAN
+
+
+class Character:
+    __slots__ = ("name", "class_id", "stat_ids", "values", "raw", "extra")
+
+    def __init__(self, name, class_id, stat_ids, values, raw, extra=None):
+        self.name = name
+        self.class_id = class_id
+        self.stat_ids = stat_ids    # array('H') of registry ids
+        self.values = values        # array('d') of numeric values, NaN when not a number
+        self.raw = raw
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, name, char_data):
+        char_stats = char_data.get("stats", {})
+        extra = {key: value for key, value in char_data.items() if key not in ("class", "stats")}
+        return cls(name,
+                   CLASS_REGISTRY.register(char_data.get("class", "All")),
+                   array("H", (STAT_REGISTRY.register(stat) for stat in char_stats)),
+                   array("d", (_character_number(value) for value in char_stats.values())),
+                   tuple(char_stats.values()),
+                   extra or None)
+
+    def to_dict(self):
+        char_data = {"class": self.char_class,
+                     "stats": {STAT_REGISTRY.label(stat_id): value for stat_id, value in zip(self.stat_ids, self.raw)}}
+        if self.extra:
+            char_data.update(self.extra)
+        return char_data
+
+    def __getstate__(self):
+        char_data = self.to_dict()
+        return (self.name, char_data["class"], tuple(char_data["stats"]), self.values, self.raw, self.extra)
+
+    def __setstate__(self, state):
+        self.name, char_class, char_stats, self.values, self.raw, self.extra = state
+        self.class_id = CLASS_REGISTRY.register(char_class)
+        self.stat_ids = array("H", (STAT_REGISTRY.register(stat) for stat in char_stats))
+
+    def value(self, stat):
+        # Numeric value of the stat, or None when missing or not a number
+        stat_id = STAT_REGISTRY.label_id(stat)
+        if stat_id is None or stat_id not in self.stat_ids:
+            return None
+        return _component(self.values[self.stat_ids.index(stat_id)])
+
+    @property
+    def char_class(self):
+        return CLASS_REGISTRY.name(self.class_id)
+
+
+class ItemRecords:
+    # Item records kept between runs (of the gear optimizer), so each item's stats are
+    # parsed once rather than on every run. A record is rebuilt only when its dict
+    # record was replaced since, which is how saves and loads change items.
+    def __init__(self):
+        self._records = {}  # item_index -> (dict record, Item)
+
+    def update(self, items):
+        # Item records for items ({item_index: dict record}), in order; records of
+        # items no longer in items are dropped.
+        previous, self._records = self._records, {}
+        records = []
+        for item_index, item_data in items.items():
+            cached = previous.get(item_index)
+            if cached is None or cached[0] is not item_data:
+                cached = (item_data, Item.from_dict(item_index, item_data))
+            self._records[item_index] = cached
+            records.append(cached[1])
+        return records
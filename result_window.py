@@ -1,10 +1,10 @@
 import customtkinter as ctk
-from constants import stats
+from stat_registry import STAT_REGISTRY
 from color_config import ColorConfig
 from stat_calculator import StatCalculator
 
 class ResultWindow(ctk.CTkToplevel):
-    def __init__(self, parent, item_stats, character_stats, language):
+    def __init__(self, parent, item_stats, character_stats, language, calculator=None):
         super().__init__(parent)
         self.title("Result")
         self.geometry("900x600")
@@ -16,7 +16,10 @@ class ResultWindow(ctk.CTkToplevel):
         self.item_stats = item_stats
         self.character_stats = character_stats
         self.parent = parent
-        self.calculator = StatCalculator(parent, item_stats, character_stats)
+        # calculator: the parent's build calculator, whose memo may already hold the results
+        self.calculator = calculator or StatCalculator(item_stats, character_stats, database=parent.database,
+                                                       item_index=parent.item_index_entry.get(),
+                                                       char_name=parent.char_name_entry.get())
 
         self.configure(fg_color=ColorConfig.FG)
         self.grid_columnconfigure(0, weight=1)
@@ -100,8 +103,7 @@ class ResultWindow(ctk.CTkToplevel):
             ("暗属性强化 (Dark Enhance)", "暗属性抗性 (Dark Resistance)"),
         ]
 
-        stat_display_map = {s[0]: (s[1], s[2]) for s in stats}
-        results = {stat: self.calculator.calculate_result(stat) for stat in stat_display_map}
+        results = self.calculator.calculate_results(STAT_REGISTRY.known_labels)
 
         for row, (stat1, stat2) in enumerate(stats_layout, start=1):
             for idx, stat in enumerate((stat1, stat2)):
@@ -109,7 +111,7 @@ class ResultWindow(ctk.CTkToplevel):
                     continue
 
                 col_base = 0 if idx == 0 else 2
-                display_stat = stat_display_map[stat][0 if self.current_language == "zh-cn" else 1]
+                display_stat = self.translate_stat(stat)
                 result_border_color = ColorConfig.ACCENT if stat in self.item_stats and results[stat] != "N/A" else ColorConfig.BORDER_DEFAULT
 
                 label = ctk.CTkLabel(
@@ -139,19 +141,14 @@ class ResultWindow(ctk.CTkToplevel):
 
 
     def translate_stat(self, stat):
-        for listbox_stat, cn_stat, en_stat in stats:
-            if listbox_stat == stat:
-                return cn_stat if self.current_language == "zh-cn" else en_stat
-        return stat
+        return STAT_REGISTRY.display_name(stat, self.current_language)
 
     def update_labels(self):
         for widget in self.frame.winfo_children():
             if isinstance(widget, ctk.CTkLabel) and widget.cget("text") not in ("Stat", "Result", ""):
-                current_text = widget.cget("text")
-                for listbox_stat, cn_stat, en_stat in stats:
-                    if current_text in (cn_stat, en_stat):
-                        widget.configure(
-                            text=self.translate_stat(listbox_stat),
-                            font=self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font
-                        )
-                        break
\ No newline at end of file
+                stat_id = STAT_REGISTRY.id_of(widget.cget("text"))
+                if stat_id is not None:
+                    widget.configure(
+                        text=self.translate_stat(STAT_REGISTRY.label(stat_id)),
+                        font=self.chinese_label_font if self.current_language == "zh-cn" else self.entry_font
+                    )
\ No newline at end of file
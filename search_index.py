@@ -0,0 +1,109 @@
+from bisect import bisect_left, bisect_right
+
+from stat_parser import item_stat_number
+
+
+class ItemSearchIndex:
+    def __init__(self, items=None):
+        self.stat_items = {}    # stat -> set of item indices having it
+        self.class_items = {}   # class -> set of item indices
+        self.stat_columns = {}  # stat -> ([sorted numeric values], [item indices in the same order])
+        self.item_keys = {}     # item index -> (class, stats, {stat: number}) currently indexed
+        self._positions = {}    # item index -> insertion order, to keep database order
+        self._next_position = 0
+        self._pending_columns = {}
+        if items:
+            self.add_items(items.items())
+            self.finish_bulk_load()
+
+    def add_items(self, items):
+        # Bulk load, possibly in batches: sets are filled right away, the numeric
+        # columns only once in finish_bulk_load instead of inserting item by item.
+        for item_index, item_data in items:
+            self._add_item(item_index, item_data, self._pending_columns)
+
+    def finish_bulk_load(self):
+        for stat, entries in self._pending_columns.items():
+            entries.extend(zip(*self.stat_columns.get(stat, ((), ()))))
+            entries.sort()
+            self.stat_columns[stat] = ([value for value, _ in entries], [index for _, index in entries])
+        self._pending_columns = {}
+
+    def add_item(self, item_index, item_data):
+        self._add_item(item_index, item_data)
+
+    def _add_item(self, item_index, item_data, pending_columns=None):
+        if item_index in self.item_keys:
+            self.remove_item(item_index, keep_position=True)
+        else:
+            self._positions[item_index] = self._next_position
+            self._next_position += 1
+        item_class = item_data.get("class", "All")
+        item_numbers = {}
+        self.class_items.setdefault(item_class, set()).add(item_index)
+        for stat, value in item_data.get("stats", {}).items():
+            self.stat_items.setdefault(stat, set()).add(item_index)
+            number = item_stat_number(stat, value)
+            if number is None:
+                continue
+            item_numbers[stat] = number
+            if pending_columns is not None:
+                pending_columns.setdefault(stat, []).append((number, item_index))
+            else:
+                values, indices = self.stat_columns.setdefault(stat, ([], []))
+                position = bisect_right(values, number)
+                values.insert(position, number)
+                indices.insert(position, item_index)
+        self.item_keys[item_index] = (item_class, tuple(item_data.get("stats", {})), item_numbers)
+
+    def remove_item(self, item_index, keep_position=False):
+        if item_index not in self.item_keys:
+            return
+        item_class, item_stats, item_numbers = self.item_keys.pop(item_index)
+        self._discard(self.class_items, item_class, item_index)
+        for stat in item_stats:
+            self._discard(self.stat_items, stat, item_index)
+        for stat, number in item_numbers.items():
+            values, indices = self.stat_columns[stat]
+            position = bisect_left(values, number)
+            while indices[position] != item_index:
+                position += 1
+            del values[position]
+            del indices[position]
+            if not values:
+                del self.stat_columns[stat]
+        if not keep_position:
+            del self._positions[item_index]
+
+    def range_items(self, stat, minimum=None, maximum=None):
+        values, indices = self.stat_columns.get(stat, ((), ()))
+        low = 0 if minimum is None else bisect_left(values, minimum)
+        high = len(values) if maximum is None else bisect_right(values, maximum)
+        return set(indices[low:high])
+
+    def search(self, selected_stats, selected_class, ranges=None):
+        # Same class rule as the original scan: "All" on either side matches everything.
+        if selected_class == "All":
+            candidates = [self._positions.keys()]
+        else:
+            candidates = [self.class_items.get(selected_class, set()) | self.class_items.get("All", set())]
+        candidates.extend(self.stat_items.get(stat, set()) for stat in set(selected_stats))
+        # ranges: {stat: (minimum, maximum)}, either bound may be None
+        candidates.extend(self.range_items(stat, minimum, maximum)
+                          for stat, (minimum, maximum) in (ranges or {}).items())
+
+        candidates.sort(key=len)
+        matched = set(candidates[0])
+        for candidate in candidates[1:]:
+            if not matched:
+                break
+            matched.intersection_update(candidate)
+        return sorted(matched, key=self._positions.__getitem__)
+
+    @staticmethod
+    def _discard(mapping, key, item_index):
+        bucket = mapping.get(key)
+        if bucket is not None:
+            bucket.discard(item_index)
+            if not bucket:
+                del mapping[key]
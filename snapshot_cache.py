@@ -0,0 +1,51 @@
+import hashlib
+import os
+import pickle
+
+# Bump when the pickled layout (database dict, ItemSearchIndex attributes) changes.
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_key(paths):
+    # Name, size, mtime and content hash of every source file; size and mtime
+    # alone miss edits within the mtime granularity or files copied over.
+    key = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if not stat.st_size:
+            continue
+        digest = hashlib.blake2b()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        key.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns, digest.hexdigest()))
+    return (SNAPSHOT_VERSION, tuple(key))
+
+
+def load_snapshot(path, key):
+    # (database, search index or None) when the cache at path was written for key.
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            if pickle.load(f) != key:
+                return None
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Error loading snapshot cache: {e}")
+        return None
+
+
+def save_snapshot(path, key, database, index=None):
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            # The key goes first so a stale cache is rejected without unpickling the data.
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((database, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except Exception as e:
+        print(f"Error saving snapshot cache: {e}")
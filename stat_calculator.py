@@ -1,54 +1,102 @@
-import re
-from constants import stats
+import heapq
+import threading
+
+from constants import stats, PERCENTAGE_STATS, ADDITIVE_STATS, SPECIAL_STATS, SPECIAL_STAT_BASES
+from search_index import ItemSearchIndex
+from stat_graph import StatGraph
+from stat_parser import compile_stat_value
+
+SEARCH_CACHE_SIZE = 256
+CANCEL_CHECK_INTERVAL = 1024  # search hits gathered between checks of a cancelled() callback
+LOCK_POLL_SECONDS = 0.05  # a cancelled search stops waiting for the lock this often
+
+STAT_GRAPH = StatGraph({stat: (base_stat,) for stat, base_stat in SPECIAL_STAT_BASES.items()},
+                       [listbox_stat for listbox_stat, _, _ in stats])
+
+
+def calculate_results(item_stats, character_stats, database=None, item_index="", char_name="", stat_names=None):
+    calculator = StatCalculator(item_stats, character_stats, database, item_index, char_name)
+    return calculator.calculate_results(stat_names)
+
+
+def result_number(result):
+    # Numeric value of a calculate_result/damage output ("260", "5.0%"); None for "", "N/A", "∞"
+    if isinstance(result, (int, float)):
+        return float(result)
+    try:
+        return float(str(result).replace('%', ''))
+    except ValueError:
+        return None
+
 
 class StatCalculator:
-    def __init__(self, parent, item_stats=None, character_stats=None):
-        self.parent = parent
-        self.item_stats = item_stats or {}
-        self.character_stats = character_stats or {}
-        self.percentage_stats = {
-            "攻击速度 (Attack Speed)",
-            "施法速度 (Casting Speed)",
-            "移动速度 (Movement Speed)"
-        }
-        self.additive_stats = {
-            "生命值 (HP)",
-            "魔法值 (MP)",
-            "力量 (Strength)",
-            "智力 (Intelligence)",
-            "体力 (Physical Strength)",
-            "精神 (Spirit)",
-            "火属性强化 (Fire Enhance)",
-            "冰属性强化 (Ice Enhance)",
-            "光属性强化 (Light Enhance)",
-            "暗属性强化 (Dark Enhance)",
-            "火属性抗性 (Fire Resistance)",
-            "冰属性抗性 (Ice Resistance)",
-            "光属性抗性 (Light Resistance)",
-            "暗属性抗性 (Dark Resistance)"
-        }
-        self.special_stats = {
-            "物理攻击力 (Physical Attack Power)",
-            "魔法攻击力 (Magical Attack Power)"
-        }
+    def __init__(self, item_stats=None, character_stats=None, database=None, item_index="", char_name=""):
+        # Plain mappings only: the calculator never touches Tk widgets, so it can
+        # run headless, from worker threads or inside worker processes.
+        # Copied: set_item_value/set_character_value must not write into the caller's dicts.
+        self.item_stats = dict(item_stats or {})
+        self.character_stats = dict(character_stats or {})
+        self.database = database if database is not None else {"items": {}, "characters": {}}
+        self.item_index = item_index
+        self.char_name = char_name
+        self.percentage_stats = PERCENTAGE_STATS
+        self.additive_stats = ADDITIVE_STATS
+        self.special_stats = SPECIAL_STATS
+        self.graph = STAT_GRAPH
+        # One memo table per build (item + character): every stat is computed once
+        # until one of its inputs changes through set_item_value/set_character_value.
+        self._memo = {}
+        self._search_index = None
+        # Search results are cached per query and dropped whenever the item data
+        # changes; database_version only ever increases.
+        self.database_version = 0
+        self._search_cache = {}
+        self._search_cache_version = 0
+        self.catalogue = None
+        self._catalogue_version = None
+        # Searches may run on a worker thread while the Tk thread updates items.
+        self._search_lock = threading.RLock()
 
     def get_item_value(self, stat):
         if stat in self.item_stats:
             return self.item_stats[stat]
-        item_index = self.parent.item_index_entry.get()
-        if item_index in self.parent.database["items"]:
-            return self.parent.database["items"][item_index].get(stat, "")
+        if self.item_index in self.database["items"]:
+            return self.database["items"][self.item_index].get(stat, "")
         return ""
 
     def get_character_value(self, stat):
         if stat in self.character_stats:
             return self.character_stats[stat]
-        char_name = self.parent.char_name_entry.get()
-        if char_name in self.parent.database["characters"]:
-            return self.parent.database["characters"][char_name].get(stat, "0")
+        if self.char_name in self.database["characters"]:
+            return self.database["characters"][self.char_name].get(stat, "0")
         return ""
 
+    def set_item_value(self, stat, value):
+        if value:
+            self.item_stats[stat] = value
+        else:
+            self.item_stats.pop(stat, None)
+        return self._recalculate(stat)
+
+    def set_character_value(self, stat, value):
+        if value:
+            self.character_stats[stat] = value
+        else:
+            self.character_stats.pop(stat, None)
+        return self._recalculate(stat)
+
+    def _recalculate(self, stat):
+        affected = self.graph.affected([stat])
+        for affected_stat in affected:
+            self._memo.pop(affected_stat, None)
+        return {affected_stat: self.calculate_result(affected_stat) for affected_stat in affected}
+
     def calculate_result(self, stat):
+        if stat not in self._memo:
+            self._memo[stat] = self._calculate_result(stat)
+        return self._memo[stat]
+
+    def _calculate_result(self, stat):
         item_value = self.get_item_value(stat)
         char_value = self.get_character_value(stat)
         
@@ -66,25 +114,21 @@ class StatCalculator:
         return (self.calculate_percentage_stat(char_value, item_value) if stat in self.percentage_stats 
                 else self.calculate_additive_stat(char_value, item_value))
 
+    def calculate_results(self, stat_names=None):
+        if stat_names is None:
+            stat_names = [listbox_stat for listbox_stat, _, _ in stats]
+        for stat in self.graph.requirements(stat_names):
+            self.calculate_result(stat)
+        return {stat: self._memo[stat] for stat in stat_names}
+
     def calculate_additive_stat(self, char_value, item_value):
         try:
-            parts = self._split_item_value(str(item_value).lstrip('+'))
-            base, bonus, percentage = 0, 0, 0
-            
-            for i, part in enumerate(parts):
-                if not part:
-                    continue
-                if '%' in part:
-                    percentage = float(part.replace('%', '')) / 100
-                elif i == 0:
-                    base = float(part)
-                elif i == 1 and '%' not in parts[1]:
-                    bonus = float(part)
-                elif i == 2:
-                    bonus = float(part)
-
-            total_base = char_value + base + bonus
-            return int(total_base + total_base * percentage)
+            parsed = compile_stat_value(item_value)
+            if parsed.base is None:
+                raise ValueError(f"invalid additive value: {item_value}")
+
+            total_base = char_value + parsed.base + parsed.bonus
+            return int(total_base + total_base * parsed.percentage)
         except (ValueError, AttributeError):
             return int(char_value) if char_value else "N/A"
 
@@ -93,19 +137,7 @@ class StatCalculator:
             if not isinstance(char_value, (int, float)):
                 char_value = 0.0
 
-            total_item_percent = 0.0
-            if item_value:
-                item_value = str(item_value).replace('+-', '-')
-                parts = re.split(r'(?<=%)[+-]', item_value.lstrip('+'))
-                for part in parts:
-                    if part:
-                        match = self._extract_percentage.search(part)
-                        if match:
-                            value = float(match.group(1))
-                            start_pos = match.start()
-                            if start_pos > 0 and part[start_pos - 1] == '-':
-                                value = -value
-                            total_item_percent += value
+            total_item_percent = compile_stat_value(item_value).percent_total if item_value else 0.0
 
             result = char_value + total_item_percent
             return f"{result}%"
@@ -115,15 +147,12 @@ class StatCalculator:
 
     def calculate_special_stat(self, stat, char_base_value, item_value):
         try:
-            parts = self._split_item_value(str(item_value).lstrip('+'))
-            total_item_value = 0
-            for part in parts:
-                if part and part.strip():
-                    total_item_value += float(part)
-
-            base_stat = ("力量 (Strength)" if stat == "物理攻击力 (Physical Attack Power)" 
-                        else "智力 (Intelligence)")
-            total_base_stat = float(self.calculate_result(base_stat))
+            total_item_value = compile_stat_value(item_value).flat_total
+            if total_item_value is None:
+                raise ValueError(f"invalid value for {stat}: {item_value}")
+
+            base_stat = SPECIAL_STAT_BASES[stat]
+            total_base_stat = float(self.calculate_result(base_stat))  # memoized
             
             result = (total_base_stat / 250) * total_item_value + total_item_value
             return int(result)
@@ -151,26 +180,114 @@ class StatCalculator:
         except ValueError:
             return "Invalid input"
 
-    def search_items(self, selected_stats, selected_class):
-        matched_items = []
-        
-        # Duyệt qua tất cả vật phẩm trong cơ sở dữ liệu
-        for item_index, item_data in self.parent.database["items"].items():
-            # Lấy class của vật phẩm, mặc định là "All" nếu không có
-            item_class = item_data.get("class", "All")
-            
-            # Kiểm tra class trước: chỉ tiếp tục nếu class hợp lệ
-            if selected_class != "All" and item_class != "All" and selected_class != item_class:
-                continue  # Bỏ qua vật phẩm nếu class không khớp
-            
-            # Lấy stats của vật phẩm
-            item_stats = item_data.get("stats", {})
-            
-            # Kiểm tra xem tất cả selected_stats có trong item_stats không
-            if all(stat in item_stats for stat in selected_stats):
-                matched_items.append((item_index, item_data))
-        
-        return matched_items
+    @property
+    def search_index(self):
+        # Built on first search unless build_search_index() ran at load time;
+        # kept in sync through update_item/remove_item.
+        if self._search_index is None:
+            self.build_search_index()
+        return self._search_index
+
+    def build_search_index(self):
+        self._search_index = ItemSearchIndex(self.database["items"])
+        return self._search_index
+
+    def set_search_index(self, index):
+        # An ItemSearchIndex already built over these items, e.g. by the loader thread.
+        self._search_index = index
+
+    def attach_catalogue(self, catalogue):
+        # A memory-mapped ItemCatalogue of the current items answers searches
+        # until the items change; after that the in-memory index takes over.
+        # Hits are still returned as database["items"] records.
+        self.catalogue = catalogue
+        self._catalogue_version = self.database_version
+
+    @property
+    def catalogue_current(self):
+        return self.catalogue is not None and self._catalogue_version == self.database_version
+
+    def bump_database_version(self):
+        self.database_version += 1
+        return self.database_version
+
+    def update_item(self, item_index):
+        with self._search_lock:
+            if item_index in self.database["items"]:
+                self.search_index.add_item(item_index, self.database["items"][item_index])
+            else:
+                self.search_index.remove_item(item_index)
+            self.bump_database_version()
+
+    def remove_item(self, item_index):
+        with self._search_lock:
+            self.search_index.remove_item(item_index)
+            self.bump_database_version()
+
+    def search_items(self, selected_stats, selected_class, ranges=None, cancelled=None):
+        # cancelled: optional callable; once it returns True the search stops and returns None,
+        # without waiting for the lock held by an earlier search.
+        while not self._search_lock.acquire(timeout=LOCK_POLL_SECONDS):
+            if cancelled is not None and cancelled():
+                return None
+        try:
+            if cancelled is not None and cancelled():
+                return None
+            return self._search_items(selected_stats, selected_class, ranges, cancelled)
+        finally:
+            self._search_lock.release()
+
+    def _search_items(self, selected_stats, selected_class, ranges=None, cancelled=None):
+        # ranges: {stat: (minimum, maximum)} over the parsed item values, either bound may be None
+        if self._search_cache_version != self.database_version:
+            self._search_cache.clear()
+            self._search_cache_version = self.database_version
+        key = (frozenset(selected_stats), selected_class, frozenset((ranges or {}).items()))
+        if key not in self._search_cache:
+            if len(self._search_cache) >= SEARCH_CACHE_SIZE:
+                self._search_cache.pop(next(iter(self._search_cache)))
+            items = self.database["items"]
+            index = self.catalogue if self.catalogue_current else self.search_index
+            matched_items = []
+            for position, item_index in enumerate(index.search(selected_stats, selected_class, ranges)):
+                if cancelled is not None and position % CANCEL_CHECK_INTERVAL == 0 and cancelled():
+                    return None  # nothing cached for a search that did not finish
+                matched_items.append((item_index, items[item_index]))
+            self._search_cache[key] = matched_items
+        return list(self._search_cache[key])
+
+    def objective_value(self, item_stats, objective_stat):
+        calculator = StatCalculator(item_stats, self.character_stats, self.database, char_name=self.char_name)
+        return result_number(calculator.calculate_result(objective_stat))
+
+    def rank_items(self, candidates, objective_stat, k=20, reference_item_stats=None, cancelled=None):
+        # Scores candidates by the computed objective stat for this calculator's character,
+        # or by the damage difference against reference_item_stats when given. Candidates
+        # are streamed through a bounded heap, so only the best k are ever kept.
+        # Returns None once the optional cancelled() callable returns True.
+        reference_value = None
+        if reference_item_stats is not None:
+            reference_value = self.objective_value(reference_item_stats, objective_stat)
+
+        best = []  # min-heap of the k best (score, -position, ...) so far
+        for position, (item_index, item_data) in enumerate(candidates):
+            if cancelled is not None and cancelled():
+                return None
+            value = self.objective_value(item_data.get("stats", {}), objective_stat)
+            if value is None:
+                continue
+            difference = None
+            score = value
+            if reference_value is not None:
+                difference = self.calculate_damage_difference(value, reference_value)
+                score = result_number(difference)
+                if score is None:
+                    continue
+            entry = (score, -position, item_index, item_data, value, difference)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
 
-    _split_item_value = re.compile(r'\+').split
-    _extract_percentage = re.compile(r'(\d+\.?\d*)%')
\ No newline at end of file
+        return [(item_index, item_data, value, difference)
+                for _, _, item_index, item_data, value, difference in sorted(best, reverse=True)]
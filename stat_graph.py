@@ -0,0 +1,45 @@
+from graphlib import TopologicalSorter
+
+
+# Dependency graph between stats: each derived stat lists the stats its formula
+# reads. Evaluating in `order` guarantees inputs are computed before the stats
+# that use them, and `affected` gives the minimal set to recompute on a change.
+class StatGraph:
+    def __init__(self, dependencies, stat_names=()):
+        self.dependencies = {stat: tuple(deps) for stat, deps in dependencies.items()}
+        graph = {stat: () for stat in stat_names}
+        for stat, deps in self.dependencies.items():
+            graph[stat] = deps
+            for dep in deps:
+                graph.setdefault(dep, ())
+        self.order = tuple(TopologicalSorter(graph).static_order())
+        self._position = {stat: i for i, stat in enumerate(self.order)}
+        self.dependents = {stat: set() for stat in self.order}
+        for stat, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents[dep].add(stat)
+
+    def requirements(self, stat_names):
+        # Requested stats plus everything they depend on, in evaluation order.
+        needed = set()
+        pending = list(stat_names)
+        while pending:
+            stat = pending.pop()
+            if stat not in needed:
+                needed.add(stat)
+                pending.extend(self.dependencies.get(stat, ()))
+        return self._sorted(needed)
+
+    def affected(self, changed_stats):
+        # Changed stats plus every stat derived from them, in evaluation order.
+        affected = set()
+        pending = list(changed_stats)
+        while pending:
+            stat = pending.pop()
+            if stat not in affected:
+                affected.add(stat)
+                pending.extend(self.dependents.get(stat, ()))
+        return self._sorted(affected)
+
+    def _sorted(self, stat_names):
+        return sorted(stat_names, key=lambda stat: self._position.get(stat, len(self._position)))
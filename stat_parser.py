@@ -0,0 +1,100 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from constants import PERCENTAGE_STATS, SPECIAL_STATS
+
+# Parsed form of an item value string such as "+50+10+5%".
+#   base, bonus, percentage -> terms used by additive stats (None if unparsable)
+#   percent_total           -> signed sum of the "%" terms used by percentage stats
+#   flat_total              -> sum of every "+" term used by special stats (None if unparsable)
+ParsedStat = namedtuple("ParsedStat", ["base", "bonus", "percentage", "percent_total", "flat_total"])
+
+PARSE_CACHE_SIZE = 4096
+
+_split_item_value = re.compile(r'\+').split
+_split_percentage_terms = re.compile(r'(?<=%)[+-]').split
+_extract_percentage = re.compile(r'(\d+\.?\d*)%')
+
+
+def _parse_additive(value):
+    parts = _split_item_value(value.lstrip('+'))
+    base, bonus, percentage = 0, 0, 0
+    try:
+        for i, part in enumerate(parts):
+            if not part:
+                continue
+            if '%' in part:
+                percentage = float(part.replace('%', '')) / 100
+            elif i == 0:
+                base = float(part)
+            elif i == 1 and '%' not in parts[1]:
+                bonus = float(part)
+            elif i == 2:
+                bonus = float(part)
+    except ValueError:
+        return None, None, None
+    return base, bonus, percentage
+
+
+def _parse_percent_total(value):
+    total = 0.0
+    if not value:
+        return total
+    value = value.replace('+-', '-')
+    for part in _split_percentage_terms(value.lstrip('+')):
+        if part:
+            match = _extract_percentage.search(part)
+            if match:
+                term = float(match.group(1))
+                start_pos = match.start()
+                if start_pos > 0 and part[start_pos - 1] == '-':
+                    term = -term
+                total += term
+    return total
+
+
+def _parse_flat_total(value):
+    total = 0
+    try:
+        for part in _split_item_value(value.lstrip('+')):
+            if part and part.strip():
+                total += float(part)
+    except ValueError:
+        return None
+    return total
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _compile(value):
+    base, bonus, percentage = _parse_additive(value)
+    return ParsedStat(base, bonus, percentage, _parse_percent_total(value), _parse_flat_total(value))
+
+
+# Raw values may be ints (save_database stores digit-only strings as int).
+def compile_stat_value(item_value):
+    return _compile(str(item_value))
+
+
+# Single comparable number for an item value, used by range filters:
+# the "%" total for percentage stats, the summed terms for special stats and
+# base + bonus for everything else. None when the value has no usable number.
+def item_stat_number(stat, item_value):
+    if not item_value:
+        return None
+    parsed = compile_stat_value(item_value)
+    if stat in PERCENTAGE_STATS:
+        return parsed.percent_total
+    if stat in SPECIAL_STATS:
+        return parsed.flat_total
+    if parsed.base is None:
+        return None
+    return parsed.base + parsed.bonus
+
+
+def clear_parse_cache():
+    _compile.cache_clear()
+
+
+def parse_cache_info():
+    return _compile.cache_info()
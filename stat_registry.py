@@ -0,0 +1,92 @@
+import sys
+import threading
+
+from constants import stats
+
+
+class StatRegistry:
+    # Interned ids for constants.stats: a stat's id is its position in the list.
+    # Every lookup is a dict or tuple index instead of a scan over the
+    # (label, CN, EN) tuples.
+    def __init__(self, stat_rows):
+        self.labels = [sys.intern(listbox_stat) for listbox_stat, _, _ in stat_rows]
+        self.cn_names = [cn_stat for _, cn_stat, _ in stat_rows]
+        self.en_names = [en_stat for _, _, en_stat in stat_rows]
+        self.known_count = len(self.labels)
+        self._label_ids = {label: stat_id for stat_id, label in enumerate(self.labels)}
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._folded_ids = {}
+        for stat_id, names in enumerate(stat_rows):
+            for name in names:
+                self._ids.setdefault(name, stat_id)
+                self._folded_ids.setdefault(name.casefold(), stat_id)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def known_labels(self):
+        # The constants.stats labels, in list order
+        return self.labels[:self.known_count]
+
+    def label_id(self, label):
+        # Id of an exact stored label (no CN/EN matching), None if never registered
+        return self._label_ids.get(label)
+
+    def register(self, label):
+        # Id for a stored stat label, adding labels outside constants.stats (kept
+        # as-is in every language) so stat rows and item records can carry any stat by id.
+        stat_id = self._label_ids.get(label)
+        if stat_id is None:
+            with self._lock:  # the Tk thread and record-building workers both register
+                stat_id = self._label_ids.get(label)
+                if stat_id is None:
+                    stat_id = len(self.labels)
+                    label = sys.intern(label)
+                    self.labels.append(label)
+                    self.cn_names.append(label)
+                    self.en_names.append(label)
+                    self._label_ids[label] = stat_id
+        return stat_id
+
+    def id_of(self, name):
+        # Combined label, CN or EN name (case-insensitive as a fallback); None if unknown
+        stat_id = self._ids.get(name)
+        if stat_id is None:
+            stat_id = self._folded_ids.get(name.strip().casefold())
+        return stat_id
+
+    def canonical(self, name):
+        stat_id = self.id_of(name)
+        return None if stat_id is None else self.labels[stat_id]
+
+    def label(self, stat_id):
+        return self.labels[stat_id]
+
+    def cn(self, stat_id):
+        return self.cn_names[stat_id]
+
+    def en(self, stat_id):
+        return self.en_names[stat_id]
+
+    def display_name(self, stat, language):
+        # Name shown for a stored stat label; unknown stats are shown as stored.
+        stat_id = self._ids.get(stat)
+        if stat_id is None:
+            return stat
+        return self.cn_names[stat_id] if language == "zh-cn" else self.en_names[stat_id]
+
+    @staticmethod
+    def intern_record(record):
+        # Records loaded one at a time (SQLite rows, journal lines) would each hold a
+        # private copy of every long bilingual stat label and class name; interned,
+        # they all share the registry's objects.
+        if "stats" in record:
+            record["stats"] = {sys.intern(stat): value for stat, value in record["stats"].items()}
+        if isinstance(record.get("class"), str):
+            record["class"] = sys.intern(record["class"])
+        return record
+
+
+STAT_REGISTRY = StatRegistry(stats)
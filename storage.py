@@ -0,0 +1,325 @@
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+
+from stat_registry import STAT_REGISTRY
+
+
+def empty_database():
+    return {"items": {}, "characters": {}}
+
+
+def write_snapshot(path, database):
+    # Write to a temp file and rename over the target so a crash never leaves
+    # a half-written database behind.
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding='utf-8') as f:
+        json.dump(database, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JsonStorage:
+    # The original layout: the whole database in one config.json.
+    # Backends with partial_writes can take write_records batches without the full database;
+    # backends with class_shards can load the items of some classes only.
+    partial_writes = False
+    class_shards = False
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, classes=None):
+        # One file holds every class, so classes is ignored and everything is loaded.
+        if not os.path.exists(self.path):
+            return empty_database()
+        with open(self.path, "r", encoding='utf-8') as f:
+            database = json.load(f)
+        for section in ("items", "characters"):
+            for record in database.get(section, {}).values():
+                STAT_REGISTRY.intern_record(record)
+        return database
+
+    def save(self, database, item_indices=(), char_names=()):
+        # JSON has no partial writes: every save rewrites the file.
+        write_snapshot(self.path, database)
+
+    def save_all(self, database):
+        self.save(database)
+
+    def compact_if_needed(self, database):
+        pass
+
+    def source_files(self):
+        return [self.path]
+
+    def close(self):
+        pass
+
+
+class JournaledJsonStorage(JsonStorage):
+    # config.json is the last snapshot; each save appends one line per changed
+    # record to config.json.journal. Once the journal passes compact_bytes, it is
+    # rotated aside and a background thread folds it into a new snapshot.
+    # Records are whole-record upserts, so replaying one twice is harmless.
+    partial_writes = True
+
+    def __init__(self, path, compact_bytes=1024 * 1024):
+        super().__init__(path)
+        self.journal_path = path + ".journal"
+        self.compacting_path = path + ".journal.compacting"
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._compaction = None
+
+    def load(self, classes=None):
+        # Under the lock so a save appending meanwhile is not mistaken for a torn tail.
+        with self._lock:
+            # A running compaction's records are only in .compacting until its snapshot is in.
+            self.wait_for_compaction()
+            database = super().load()
+            for journal_path in (self.compacting_path, self.journal_path):
+                self._replay(journal_path, database)
+            if os.path.exists(self.compacting_path):
+                # Left over from a crash or a failed compaction: fold both journals into a
+                # new snapshot, or compaction would stay blocked behind it.
+                write_snapshot(self.path, database)
+                for journal_path in (self.compacting_path, self.journal_path):
+                    if os.path.exists(journal_path):
+                        os.remove(journal_path)
+        return database
+
+    @staticmethod
+    def _replay(journal_path, database):
+        if not os.path.exists(journal_path):
+            return
+        valid_bytes = 0
+        with open(journal_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final line from a crash mid-append
+                valid_bytes += len(line)
+                section = database.setdefault(record["kind"], {})
+                if record["value"] is None:
+                    section.pop(record["key"], None)
+                else:
+                    section[record["key"]] = STAT_REGISTRY.intern_record(record["value"])
+        if valid_bytes < os.path.getsize(journal_path):
+            # Drop the torn tail so later appends are not hidden behind it.
+            os.truncate(journal_path, valid_bytes)
+
+    def save(self, database, item_indices=(), char_names=()):
+        records = [{"kind": "items", "key": key, "value": database["items"].get(key)} for key in item_indices]
+        records += [{"kind": "characters", "key": key, "value": database["characters"].get(key)} for key in char_names]
+        with self._lock:
+            self._append(records)
+        self.compact_if_needed(database)
+
+    def write_records(self, items, characters):
+        # Upserts (None deletes) without the full database at hand, e.g. from a
+        # worker thread; compaction waits for compact_if_needed, which has it.
+        records = [{"kind": "items", "key": key, "value": value} for key, value in items.items()]
+        records += [{"kind": "characters", "key": key, "value": value} for key, value in characters.items()]
+        with self._lock:
+            self._append(records)
+
+    def _append(self, records):
+        if not records:
+            return
+        with open(self.journal_path, "a", encoding='utf-8') as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save_all(self, database):
+        self.wait_for_compaction()
+        with self._lock:
+            write_snapshot(self.path, database)
+            for journal_path in (self.compacting_path, self.journal_path):
+                if os.path.exists(journal_path):
+                    os.remove(journal_path)
+
+    def compact_if_needed(self, database):
+        # Call from the thread that owns database: the snapshot is copied here.
+        with self._lock:
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) >= self.compact_bytes:
+                self._start_compaction(database)
+
+    def _start_compaction(self, database):
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        # Shallow copy on the caller's thread: records are replaced, never mutated, on save.
+        snapshot = {"items": dict(database["items"]), "characters": dict(database["characters"])}
+        if os.path.exists(self.compacting_path):
+            # A failed compaction left its journal; database holds its records too, so the
+            # journal joins it and this snapshot covers both.
+            with open(self.journal_path, "rb") as journal, open(self.compacting_path, "ab") as compacting:
+                shutil.copyfileobj(journal, compacting)
+                compacting.flush()
+                os.fsync(compacting.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+        self._compaction = threading.Thread(target=self._compact, args=(snapshot,), daemon=True)
+        self._compaction.start()
+
+    def _compact(self, snapshot):
+        try:
+            write_snapshot(self.path, snapshot)
+            os.remove(self.compacting_path)
+        except OSError as e:
+            print(f"Error compacting journal: {e}")
+
+    def source_files(self):
+        return [self.path, self.compacting_path, self.journal_path]
+
+    def wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def close(self):
+        self.wait_for_compaction()
+
+
+class SqliteStorage:
+    # items/characters keep the full JSON record; searches run on the in-memory
+    # index. The class column partitions the items into per-class shards that
+    # load() can read on their own.
+    partial_writes = True
+    class_shards = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            item_index TEXT PRIMARY KEY,
+            class TEXT NOT NULL DEFAULT 'All',
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS characters (
+            name TEXT PRIMARY KEY,
+            class TEXT NOT NULL DEFAULT 'All',
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_class ON items(class);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def load(self, classes=None):
+        # classes: the item classes (shards) to load, None for all; characters are always loaded.
+        database = empty_database()
+        query = "SELECT item_index, data FROM items"
+        params = []
+        if classes is not None:
+            params = sorted(classes)
+            query += f" WHERE class IN ({', '.join('?' for _ in params)})"
+        query += " ORDER BY rowid"
+        with self._lock:
+            for item_index, data in self.connection.execute(query, params):
+                database["items"][item_index] = STAT_REGISTRY.intern_record(json.loads(data))
+            for name, data in self.connection.execute("SELECT name, data FROM characters ORDER BY rowid"):
+                database["characters"][name] = STAT_REGISTRY.intern_record(json.loads(data))
+        return database
+
+    def load_item(self, item_index):
+        # One record from any shard, loaded or not; None if missing.
+        with self._lock:
+            row = self.connection.execute("SELECT data FROM items WHERE item_index = ?", (item_index,)).fetchone()
+        return None if row is None else STAT_REGISTRY.intern_record(json.loads(row[0]))
+
+    def save(self, database, item_indices=(), char_names=()):
+        with self._lock, self.connection:
+            for item_index in item_indices:
+                if item_index in database["items"]:
+                    self._upsert_item(item_index, database["items"][item_index])
+                else:
+                    self.connection.execute("DELETE FROM items WHERE item_index = ?", (item_index,))
+            for name in char_names:
+                if name in database["characters"]:
+                    self._upsert_character(name, database["characters"][name])
+                else:
+                    self.connection.execute("DELETE FROM characters WHERE name = ?", (name,))
+
+    def save_all(self, database):
+        self.save(database, list(database["items"]), list(database["characters"]))
+
+    def write_records(self, items, characters):
+        # One transaction per batch; a None record is deleted.
+        with self._lock, self.connection:
+            for item_index, item_data in items.items():
+                if item_data is None:
+                    self.connection.execute("DELETE FROM items WHERE item_index = ?", (item_index,))
+                else:
+                    self._upsert_item(item_index, item_data)
+            for name, char_data in characters.items():
+                if char_data is None:
+                    self.connection.execute("DELETE FROM characters WHERE name = ?", (name,))
+                else:
+                    self._upsert_character(name, char_data)
+
+    def compact_if_needed(self, database):
+        pass
+
+    def _upsert_item(self, item_index, item_data):
+        self.connection.execute(
+            "INSERT INTO items (item_index, class, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(item_index) DO UPDATE SET class = excluded.class, data = excluded.data",
+            (item_index, item_data.get("class", "All"), json.dumps(item_data, ensure_ascii=False))
+        )
+
+    def _upsert_character(self, name, char_data):
+        self.connection.execute(
+            "INSERT INTO characters (name, class, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET class = excluded.class, data = excluded.data",
+            (name, char_data.get("class", "All"), json.dumps(char_data, ensure_ascii=False))
+        )
+
+    def source_files(self):
+        # The -wal file only has content until the last connection checkpoints it on close.
+        return [self.path, self.path + "-wal"]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def default_database_path():
+    # SQLite is used once config.db exists (python storage.py migrates config.json)
+    return "config.db" if os.path.exists("config.db") else "config.json"
+
+
+def open_storage(path, journaled=True):
+    if os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return SqliteStorage(path)
+    return JournaledJsonStorage(path) if journaled else JsonStorage(path)
+
+
+def migrate_json_to_sqlite(json_path, sqlite_path):
+    database = JournaledJsonStorage(json_path).load()
+    storage = SqliteStorage(sqlite_path)
+    try:
+        storage.save_all(database)
+    finally:
+        storage.close()
+    return len(database["items"]), len(database["characters"])
+
+
+if __name__ == "__main__":
+    # python storage.py config.json config.db
+    source = sys.argv[1] if len(sys.argv) > 1 else "config.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "config.db"
+    items, characters = migrate_json_to_sqlite(source, target)
+    print(f"Migrated {items} items and {characters} characters from {source} to {target}")
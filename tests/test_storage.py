@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from storage import JournaledJsonStorage, write_snapshot
+
+
+def item(value):
+    return {"class": "All", "stats": {"力量 (Strength)": value}}
+
+
+class JournaledJsonStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def storage(self, compact_bytes=1024 * 1024):
+        return JournaledJsonStorage(self.path, compact_bytes=compact_bytes)
+
+    def read_snapshot(self):
+        with open(self.path, "r", encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_torn_tail_is_dropped_and_later_appends_replay(self):
+        storage = self.storage()
+        storage.write_records({"1": item(1), "2": item(2)}, {})
+        valid_size = os.path.getsize(storage.journal_path)
+        with open(storage.journal_path, "ab") as f:
+            f.write(b'{"kind": "items", "key": "3", "val')
+
+        database = storage.load()
+        self.assertEqual(database["items"], {"1": item(1), "2": item(2)})
+        self.assertEqual(os.path.getsize(storage.journal_path), valid_size)
+
+        storage.write_records({"4": item(4)}, {"bob": item(5)})
+        database = self.storage().load()
+        self.assertEqual(set(database["items"]), {"1", "2", "4"})
+        self.assertEqual(database["characters"], {"bob": item(5)})
+
+    def test_deletes_replay(self):
+        storage = self.storage()
+        storage.write_records({"1": item(1), "2": item(2)}, {})
+        storage.write_records({"1": None}, {})
+        self.assertEqual(self.storage().load()["items"], {"2": item(2)})
+
+    def test_rotation_folds_the_journal_into_a_snapshot(self):
+        storage = self.storage(compact_bytes=1)
+        database = {"items": {"1": item(1)}, "characters": {}}
+        storage.save(database, item_indices=["1"])
+        storage.wait_for_compaction()
+        self.assertEqual(self.read_snapshot()["items"], {"1": item(1)})
+        self.assertFalse(os.path.exists(storage.journal_path))
+        self.assertFalse(os.path.exists(storage.compacting_path))
+
+        database["items"]["2"] = item(2)
+        storage.write_records({"2": item(2)}, {})
+        self.assertEqual(self.storage().load()["items"], {"1": item(1), "2": item(2)})
+
+    def test_load_waits_for_a_running_compaction(self):
+        storage = self.storage(compact_bytes=1)
+        release = threading.Event()
+        compact = storage._compact
+
+        def slow_compact(snapshot):
+            release.wait()
+            compact(snapshot)
+
+        storage._compact = slow_compact
+        database = {"items": {"1": item(1)}, "characters": {}}
+        storage.save(database, item_indices=["1"])
+        self.assertTrue(os.path.exists(storage.compacting_path))
+
+        loaded = []
+        loader = threading.Thread(target=lambda: loaded.append(storage.load()))
+        loader.start()
+        loader.join(0.2)
+        self.assertTrue(loader.is_alive())
+        release.set()
+        loader.join()
+        self.assertEqual(loaded[0]["items"], {"1": item(1)})
+        self.assertFalse(os.path.exists(storage.compacting_path))
+
+    def test_leftover_compacting_journal_is_folded_on_load(self):
+        write_snapshot(self.path, {"items": {"1": item(1)}, "characters": {}})
+        storage = self.storage(compact_bytes=1)
+        storage.write_records({"2": item(2)}, {})
+        os.replace(storage.journal_path, storage.compacting_path)
+        storage.write_records({"3": item(3)}, {})
+
+        database = self.storage(compact_bytes=1).load()
+        self.assertEqual(set(database["items"]), {"1", "2", "3"})
+        self.assertEqual(set(self.read_snapshot()["items"]), {"1", "2", "3"})
+        self.assertFalse(os.path.exists(storage.compacting_path))
+        self.assertFalse(os.path.exists(storage.journal_path))
+
+    def test_compaction_after_a_failed_one_covers_both_journals(self):
+        storage = self.storage(compact_bytes=1)
+        database = {"items": {"1": item(1)}, "characters": {}}
+        storage._compact = lambda snapshot: None  # fails, leaving .compacting behind
+        storage.save(database, item_indices=["1"])
+        storage.wait_for_compaction()
+        self.assertTrue(os.path.exists(storage.compacting_path))
+
+        del storage._compact
+        database["items"]["2"] = item(2)
+        storage.save(database, item_indices=["2"])
+        storage.wait_for_compaction()
+        self.assertEqual(self.read_snapshot()["items"], {"1": item(1), "2": item(2)})
+        self.assertFalse(os.path.exists(storage.compacting_path))
+        self.assertFalse(os.path.exists(storage.journal_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import math
+
+import customtkinter as ctk
+
+ROW_PADY = 10
+
+
+class VirtualList(ctk.CTkFrame):
+    # Scrollable list that only holds as many rows as fit in its viewport. create_row(parent)
+    # makes a row widget the first time a slot is needed; bind_row(slot, item) refills slot
+    # with an item each time the list scrolls, so the number of widgets does not depend on
+    # len(items). Scrolling moves by whole items. Rows may differ in height: the pool is
+    # sized from the shortest row seen so far, and the end of the list from the tallest,
+    # starting from the row_height estimate until rows have been measured.
+    def __init__(self, master, create_row, bind_row, row_height, **kwargs):
+        super().__init__(master, **kwargs)
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.shortest = self.tallest = row_height
+        self.measured = False
+        self.row_count = 1
+        self.items = []
+        self.first = 0
+        self.rows = []
+        self._scroll_bound = set()
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=0, column=0, sticky="nsew")
+        self.viewport.grid_columnconfigure(0, weight=1)
+        self.viewport.grid_propagate(False)  # rows past the bottom edge are clipped instead of growing the list
+        self.viewport.bind("<Configure>", lambda e: self.render(), add="+")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.bind_scroll(self.viewport)
+
+    def set_items(self, items):
+        # items: any sequence; only the visible slice is read.
+        self.items = items
+        self.first = 0
+        self.render()
+
+    def page_size(self):
+        # Items that fit in the viewport even if each is as tall as the tallest row seen
+        return max(1, self.viewport.winfo_height() // self.tallest)
+
+    def scroll_to(self, first):
+        first = max(0, min(first, len(self.items) - self.page_size()))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def render(self):
+        # Enough rows to fill the viewport even if all are as short as the shortest row seen,
+        # the last one possibly cut off at the bottom edge
+        self.row_count = max(1, math.ceil(self.viewport.winfo_height() / self.shortest))
+        visible = max(0, min(self.row_count, len(self.items) - self.first))
+        while len(self.rows) < visible:
+            self.rows.append(self.create_row(self.viewport))
+        for slot, row in enumerate(self.rows):
+            if slot < visible:
+                self.bind_row(slot, self.items[self.first + slot])
+                row.grid(row=slot, column=0, padx=15, pady=ROW_PADY, sticky="ew")
+            else:
+                row.grid_remove()
+        for row in self.rows[:visible]:
+            self.bind_scroll(row)
+            self.measure(row)
+        if self.items:
+            self.scrollbar.set(self.first / len(self.items), (self.first + visible) / len(self.items))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def measure(self, row):
+        # Requested heights lag one layout pass behind a rebind; unlaid-out rows report 1.
+        height = row.winfo_reqheight()
+        if height <= 1:
+            return
+        height += 2 * ROW_PADY
+        if not self.measured:
+            self.shortest = self.tallest = height
+            self.measured = True
+        self.shortest = min(self.shortest, height)
+        self.tallest = max(self.tallest, height)
+
+    def bind_scroll(self, widget):
+        # Wheel events go to the widget under the pointer, so every widget in a row
+        # is bound; each only once, rows may grow children when rebound.
+        if id(widget) not in self._scroll_bound:
+            self._scroll_bound.add(id(widget))
+            widget.bind("<MouseWheel>", self.on_mousewheel, add="+")
+            widget.bind("<Button-4>", lambda e: self.scroll_to(self.first - 1), add="+")
+            widget.bind("<Button-5>", lambda e: self.scroll_to(self.first + 1), add="+")
+        for child in widget.winfo_children():
+            self.bind_scroll(child)
+
+    def on_mousewheel(self, event):
+        self.scroll_to(self.first + (-1 if event.delta > 0 else 1))
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.items)))
+        elif unit == "pages":
+            self.scroll_to(self.first + int(amount) * self.page_size())
+        else:
+            self.scroll_to(self.first + int(amount))
@@ -0,0 +1,71 @@
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from stat_calculator import StatCalculator, calculate_results, result_number
+
+# One candidate swap: per-stat deltas against the current gear and the
+# calculate_damage_difference of the objective stat ("12.50%", "N/A", ...),
+# with score the number parsed from it once (None when it has none).
+Comparison = namedtuple("Comparison", ["item_index", "objective_value", "difference", "deltas", "score"])
+
+
+def compare_chunk(candidates, character_stats, character_db, char_name, current_results, objective_stat):
+    # Runs in a worker process: character_db only holds the one character record.
+    calculator = StatCalculator()
+    rows = []
+    for item_index, item_stats in candidates:
+        results = calculate_results(item_stats, character_stats, character_db, char_name=char_name,
+                                    stat_names=list(current_results))
+        deltas = {}
+        for stat, value in results.items():
+            new_value, old_value = result_number(value), result_number(current_results[stat])
+            if new_value is not None and old_value is not None and new_value != old_value:
+                deltas[stat] = new_value - old_value
+        objective_value = result_number(results[objective_stat])
+        difference = calculator.calculate_damage_difference(objective_value, result_number(current_results[objective_stat]))
+        rows.append(Comparison(item_index, objective_value, difference, deltas, result_number(difference)))
+    return rows
+
+
+def sort_key(comparison):
+    return (comparison.score is not None, comparison.score if comparison.score is not None else 0.0)
+
+
+def compare_all(database, item_index, item_stats, character_stats, char_name, char_class, objective_stat,
+                job=None, chunk_size=200, max_workers=None):
+    character_db = {"items": {}, "characters": {}}
+    if char_name in database["characters"]:
+        character_db["characters"][char_name] = database["characters"][char_name]
+    current_results = calculate_results(item_stats, character_stats, character_db, char_name=char_name)
+
+    candidates = [
+        (index, item_data.get("stats", {}))
+        for index, item_data in database["items"].items()
+        if index != item_index and (char_class == "All" or item_data.get("class", "All") in ("All", char_class))
+    ]
+    chunks = [candidates[i:i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+
+    comparisons = []
+    done = 0
+    cancelled = False
+    executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+    try:
+        pending = {executor.submit(compare_chunk, chunk, character_stats, character_db, char_name,
+                                   current_results, objective_stat) for chunk in chunks}
+        while pending:
+            if job is not None and job.cancelled:
+                cancelled = True
+                break
+            finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rows = future.result()
+                comparisons.extend(rows)
+                done += 1
+                if job is not None:
+                    job.report(rows, done, len(chunks))
+    finally:
+        executor.shutdown(wait=not cancelled, cancel_futures=True)
+
+    comparisons.sort(key=sort_key, reverse=True)
+    return comparisons, cancelled
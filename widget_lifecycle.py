@@ -0,0 +1,62 @@
+from collections import Counter
+
+MAX_IDLE_WIDGETS = 64  # released widgets kept per (frame, kind); the rest are destroyed
+
+
+class WidgetLifecycle:
+    # Creates, reuses and destroys the widgets of the rows that come and go (stat rows,
+    # search result rows). acquire() hands back a released widget of the same kind
+    # before creating one; release() un-grids a widget and keeps it for reuse, so a
+    # rebuild does not leave forgotten widgets behind. Counters are kept per frame name.
+    def __init__(self, max_idle=MAX_IDLE_WIDGETS):
+        self.max_idle = max_idle
+        self.idle = {}  # (frame name, kind) -> released widgets
+        self.created = Counter()
+        self.reused = Counter()
+        self.destroyed = Counter()
+
+    def acquire(self, frame_name, kind, factory):
+        idle = self.idle.get((frame_name, kind))
+        if idle:
+            self.reused[frame_name] += 1
+            return idle.pop()
+        self.created[frame_name] += 1
+        return factory()
+
+    def track(self, frame_name, widget):
+        # Counts a widget created outside acquire() (e.g. a fixed pool) as live.
+        self.created[frame_name] += 1
+        return widget
+
+    def release(self, frame_name, kind, widget):
+        widget.grid_forget()
+        idle = self.idle.setdefault((frame_name, kind), [])
+        if len(idle) < self.max_idle:
+            idle.append(widget)
+        else:
+            self.destroy(frame_name, widget)
+
+    def destroy(self, frame_name, widget):
+        widget.destroy()
+        self.destroyed[frame_name] += 1
+
+    def live(self, frame_name):
+        return self.created[frame_name] - self.destroyed[frame_name]
+
+    def idle_count(self, frame_name):
+        return sum(len(idle) for (name, _), idle in self.idle.items() if name == frame_name)
+
+    def readout(self, root=None):
+        # One line for status_label: live (idle) widgets and allocations per frame,
+        # plus the real number of Tk widgets under root when given.
+        parts = [f"{frame_name}: {self.live(frame_name)} live ({self.idle_count(frame_name)} idle), "
+                 f"{self.created[frame_name]} created, {self.reused[frame_name]} reused"
+                 for frame_name in sorted(self.created)]
+        if root is not None:
+            parts.append(f"Tk widgets: {count_widgets(root)}")
+        return " | ".join(parts) or "No tracked widgets"
+
+
+def count_widgets(widget):
+    # Every Tk widget under widget, including the ones customtkinter builds internally.
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())